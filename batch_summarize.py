@@ -0,0 +1,41 @@
+"""Summarizes many companies' reports headlessly, several companies at a time.
+
+SOURCE is either a directory (one subfolder per company, or PDFs named <company>_<report>.pdf)
+or a CSV manifest with company and path columns. Each company's summary1page.docx and
+summary2page.docx are written to OUTPUT/<company>/. Rerunning the same command resumes an
+interrupted batch: companies whose documents have not changed are skipped.
+
+Usage:
+    python batch_summarize.py SOURCE [--output output] [--workers 4] [--force] [--regenerate]
+"""
+import argparse
+import logging
+import sys
+from src.logging_config import setup_logging
+from src.batch import discover_jobs, run_batch
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('source', help='directory of reports or CSV manifest')
+    parser.add_argument('--output', default='output', help='folder that receives one subfolder per company')
+    parser.add_argument('--workers', type=int, default=4, help='companies summarized at once')
+    parser.add_argument('--force', action='store_true', help='resummarize companies that are already up to date')
+    parser.add_argument('--regenerate', action='store_true', help='ignore cached LLM responses')
+    args = parser.parse_args()
+
+    setup_logging()
+    jobs = discover_jobs(args.source)
+    if not jobs:
+        parser.error(f"No PDF files found in {args.source}.")
+    logging.info(f"Found {sum(len(paths) for paths in jobs.values())} documents for {len(jobs)} companies")
+
+    report = run_batch(jobs, output_root=args.output, max_workers=args.workers, force=args.force, bypass_cache=args.regenerate)
+    print(f"{report['completed']} summarized, {report['skipped']} up to date, {len(report['failed'])} failed "
+          f"out of {report['companies']} companies in {report['seconds']:.1f}s")
+    print(f"Throughput: {report['companies_per_hour']:.1f} companies/hour, {report['pages_per_second']:.2f} pages/s")
+    for failure in report['failed']:
+        print(f"  {failure['company']}: {failure['error']}")
+    sys.exit(1 if report['failed'] else 0)
+
+if __name__ == '__main__':
+    main()
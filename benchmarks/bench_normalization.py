@@ -0,0 +1,43 @@
+"""Compares TextProcessor.preprocess_text + format_text with the line-aware normalizer.
+
+Usage:
+    python benchmarks/bench_normalization.py [path/to/report.pdf] [--repeat N]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.pdf_extractor import PDFExtractor
+from src.text_normalizer import normalize_text
+from src.text_processor import TextProcessor
+
+def time_call(func, text, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('pdf_path', nargs='?', default='data/Apple_10K.pdf')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    # Only the regex stages are measured, so the lightweight sentencizer pipeline is enough
+    processor = TextProcessor(segmentation_mode="sentencizer")
+    text = PDFExtractor(args.pdf_path).extract_text()
+    print(f"{args.pdf_path}: {len(text) / 1e6:.2f} MB of extracted text")
+
+    current_time, current = time_call(lambda t: processor.format_text(processor.preprocess_text(t)), text, args.repeat)
+    normalized_time, normalized = time_call(normalize_text, text, args.repeat)
+    print(f"preprocess_text + format_text: {current_time * 1000:8.1f} ms  {current.count('###') // 2:5d} headings")
+    print(f"normalize_text:                {normalized_time * 1000:8.1f} ms  {normalized.count('###') // 2:5d} headings")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+"""Runs the full summarization pipeline headlessly on the sample reports and checks for regressions.
+
+The LLM is replaced by the deterministic local backend and every cache, the Chroma store and the
+output folder live in a temporary directory, so each run measures a cold pipeline unless --warm is
+given. Per-stage wall time, peak RSS and throughput are compared with a stored baseline; the script
+exits with status 1 when a stage or peak RSS exceeds its baseline by more than --tolerance, and with
+status 2 when there is no baseline for the mode or it was recorded on other documents or settings.
+
+Usage:
+    python benchmarks/bench_pipeline.py [data/*.pdf] [--warm] [--llm-latency S]
+        [--baseline benchmarks/baseline.json] [--save-baseline] [--tolerance 0.25] [--json results.json]
+"""
+import argparse
+import glob
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+# Stages faster than this are too noisy to flag as regressions
+MIN_REGRESSION_SECONDS = 0.05
+
+def peak_rss_mb():
+    """Peak resident set size of this process and of its finished worker processes, in MB."""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return max(own, children) / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+def run_benchmark(pdf_paths, work_dir, warm, llm_latency):
+    os.environ['LLM_BACKEND'] = 'local'
+    os.environ['LOCAL_LLM_LATENCY_SECONDS'] = str(llm_latency)
+    os.environ['CHROMADB_PERSIST_DIRECTORY'] = os.path.join(work_dir, 'chroma_db')
+    os.environ['TEXT_CACHE_DIRECTORY'] = os.path.join(work_dir, 'cache', 'text')
+    os.environ['EMBEDDING_CACHE_PATH'] = os.path.join(work_dir, 'cache', 'embeddings.sqlite3')
+    os.environ['RESPONSE_CACHE_PATH'] = os.path.join(work_dir, 'cache', 'responses.sqlite3')
+    os.environ['METRICS_REPORT_DIRECTORY'] = ''
+    # Imported only now so the pipeline picks up the isolated locations above
+    from src.config_manager import get_config
+    from src.pipeline import run_pipeline
+
+    documents = []
+    for pdf_path in pdf_paths:
+        with open(pdf_path, 'rb') as f:
+            documents.append((os.path.basename(pdf_path), f.read()))
+    output_dir = os.path.join(work_dir, 'output')
+    if warm:
+        run_pipeline(documents, output_dir=output_dir)
+
+    start = time.perf_counter()
+    result = run_pipeline(documents, output_dir=output_dir)
+    total_seconds = time.perf_counter() - start
+    return {
+        'documents': [os.path.basename(path) for path in pdf_paths],
+        'mode': 'warm' if warm else 'cold',
+        'settings': benchmark_settings(get_config(), llm_latency),
+        'total_seconds': total_seconds,
+        'peak_rss_mb': peak_rss_mb(),
+        'pages': result.num_pages,
+        'chunks': result.num_chunks,
+        'pages_per_second': result.num_pages / total_seconds if total_seconds else 0.0,
+        'chunks_per_second': result.num_chunks / total_seconds if total_seconds else 0.0,
+        'stages': result.metrics.report(),
+        'llm': result.metrics.to_dict()['totals']
+    }
+
+def benchmark_settings(config, llm_latency):
+    """The settings that shape the timings; results are only compared with a baseline made with the same ones."""
+    from src import token_utils
+    return {
+        'segmentation_mode': config.get_segmentation_mode(),
+        'summarization_mode': config.get_summarization_mode(),
+        'pdf_extraction_workers': config.get_pdf_extraction_workers(),
+        'chunk_max_tokens': config.get_chunk_max_tokens(),
+        'chunk_overlap_tokens': config.get_chunk_overlap_tokens(),
+        'dedup_enabled': config.get_dedup_enabled(),
+        'relevance_keep_ratio': config.get_relevance_keep_ratio(),
+        'table_facts_enabled': config.get_table_facts_enabled(),
+        'num_clusters': config.get_num_clusters(),
+        'llm_latency': llm_latency,
+        # Without tiktoken, token counts and so the chunks are estimated from characters
+        'tokenizer': 'tiktoken' if token_utils.tiktoken else 'estimate'
+    }
+
+def baseline_mismatch(results, baseline):
+    """Describes how the run differs from the baseline in documents or settings, or returns None if it does not."""
+    if baseline['documents'] != results['documents']:
+        return f"documents {results['documents']} vs baseline {baseline['documents']}"
+    settings, baseline_settings = results['settings'], baseline.get('settings', {})
+    differences = [
+        f"{name}={settings.get(name)!r} vs baseline {baseline_settings.get(name)!r}"
+        for name in sorted(set(settings) | set(baseline_settings)) if settings.get(name) != baseline_settings.get(name)
+    ]
+    return ", ".join(differences) or None
+
+def compare_with_baseline(results, baseline, tolerance):
+    """Returns a description of every stage, the total and peak RSS that regressed beyond tolerance."""
+    regressions = []
+    checks = [('total', results['total_seconds'], baseline.get('total_seconds'), 's')]
+    checks += [
+        (stage, timing['seconds'], baseline.get('stages', {}).get(stage, {}).get('seconds'), 's')
+        for stage, timing in results['stages'].items()
+    ]
+    for name, current, previous, unit in checks:
+        if previous is None:
+            continue
+        if current > previous * (1 + tolerance) and current - previous > MIN_REGRESSION_SECONDS:
+            regressions.append(f"{name}: {current:.2f}{unit} vs baseline {previous:.2f}{unit}")
+    previous_rss = baseline.get('peak_rss_mb')
+    if previous_rss and results['peak_rss_mb'] > previous_rss * (1 + tolerance):
+        regressions.append(f"peak RSS: {results['peak_rss_mb']:.0f} MB vs baseline {previous_rss:.0f} MB")
+    return regressions
+
+def print_results(results, baseline):
+    baseline_stages = baseline.get('stages', {}) if baseline else {}
+    print(f"{len(results['documents'])} documents, {results['pages']} pages, {results['chunks']} chunks ({results['mode']} caches)")
+    for stage, timing in results['stages'].items():
+        line = f"{stage:>14}: {timing['seconds']:8.2f}s  {timing['items']:7,} items"
+        if stage in baseline_stages:
+            line += f"  (baseline {baseline_stages[stage]['seconds']:.2f}s)"
+        print(line)
+    print(f"{'total':>14}: {results['total_seconds']:8.2f}s")
+    print(f"{'peak RSS':>14}: {results['peak_rss_mb']:8.0f} MB")
+    print(f"{'throughput':>14}: {results['pages_per_second']:8.2f} pages/s  {results['chunks_per_second']:.2f} chunks/s")
+    print(f"{'LLM':>14}: {results['llm']['llm_calls']:8,} calls  {results['llm']['prompt_tokens']:,} prompt tokens  "
+          f"{results['llm']['completion_tokens']:,} completion tokens")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('pdf_paths', nargs='*')
+    parser.add_argument('--warm', action='store_true', help='run once to fill the caches, then measure a second run')
+    parser.add_argument('--llm-latency', type=float, default=0.0, help='simulated seconds per LLM call')
+    parser.add_argument('--baseline', default=os.path.join(ROOT, 'benchmarks', 'baseline.json'))
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown before a stage counts as a regression')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    pdf_paths = [os.path.abspath(path) for path in args.pdf_paths or sorted(glob.glob(os.path.join(ROOT, 'data', '*.pdf')))]
+    if not pdf_paths:
+        parser.error("No PDF files to benchmark.")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        results = run_benchmark(pdf_paths, work_dir, args.warm, args.llm_latency)
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baselines = json.load(f)
+    baseline = baselines.get(results['mode'])
+    print_results(results, baseline)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        baselines[results['mode']] = results
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, indent=2)
+        print(f"Saved {results['mode']} baseline to {args.baseline}")
+        return
+    if baseline is None:
+        print(f"No {results['mode']} baseline in {args.baseline}; run with --save-baseline to record one.")
+        sys.exit(2)
+    mismatch = baseline_mismatch(results, baseline)
+    if mismatch:
+        print(f"The {results['mode']} baseline was recorded with other documents or settings ({mismatch}); "
+              f"run with the same ones or record a new baseline with --save-baseline.")
+        sys.exit(2)
+    regressions = compare_with_baseline(results, baseline, args.tolerance)
+    if regressions:
+        print("Performance regressions:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("No regressions against the baseline.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+"""Compares sentence segmentation modes of TextProcessor on a sample report.
+
+Usage:
+    python benchmarks/bench_segmentation.py [path/to/report.pdf] [--n-process N]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.pdf_extractor import PDFExtractor
+from src.text_processor import TextProcessor, SEGMENTATION_MODES
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('pdf_path', nargs='?', default='data/Apple_10K.pdf')
+    parser.add_argument('--n-process', type=int, default=1)
+    args = parser.parse_args()
+
+    raw_text = PDFExtractor(args.pdf_path).extract_text()
+    reference = TextProcessor()
+    formatted_text = reference.format_text(reference.preprocess_text(raw_text))
+    print(f"{args.pdf_path}: {len(formatted_text):,} characters after formatting")
+
+    baseline_sentences = None
+    for mode in SEGMENTATION_MODES:
+        processor = reference if mode == "full" else TextProcessor(segmentation_mode=mode, n_process=args.n_process)
+        start = time.perf_counter()
+        sentences = processor.enhance_text_with_nlp(formatted_text).splitlines()
+        elapsed = time.perf_counter() - start
+        if baseline_sentences is None:
+            baseline_sentences = set(sentences)
+        agreement = len(baseline_sentences.intersection(sentences)) / max(len(baseline_sentences), 1)
+        print(f"{mode:>12}: {elapsed:8.2f}s  {len(sentences):7,} sentences  {agreement:6.1%} agreement with full")
+
+if __name__ == '__main__':
+    main()
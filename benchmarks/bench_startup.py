@@ -0,0 +1,64 @@
+"""Measures cold import time of the app's entry points and which heavy libraries they load.
+
+Each target is imported in a fresh interpreter several times and the median wall time is
+reported, together with any heavy dependency that the import pulled in eagerly.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+TARGETS = {
+    'src.openai_utils': "import src.openai_utils",
+    'src.chromadb_utils': "import src.chromadb_utils",
+    'src.pipeline': "import src.pipeline",
+    'app': "import app",
+    'test discovery': "import unittest; unittest.TestLoader().discover('tests')",
+}
+HEAVY_MODULES = ('spacy', 'sklearn', 'chromadb', 'openai', 'pdfplumber', 'pandas', 'numpy', 'docx', 'torch')
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+exec({statement!r})
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'heavy': [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+def measure(statement, runs):
+    timings = []
+    heavy = []
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, '-c', PROBE.format(statement=statement, heavy=HEAVY_MODULES)],
+            cwd=ROOT, capture_output=True, text=True
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        timings.append(result['seconds'])
+        heavy = result['heavy']
+    return statistics.median(timings), heavy
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    for name, statement in TARGETS.items():
+        try:
+            seconds, heavy = measure(statement, args.runs)
+        except RuntimeError as e:
+            print(f"{name:>18}: failed ({e})")
+            continue
+        print(f"{name:>18}: {seconds * 1000:8.1f} ms  eagerly loaded: {', '.join(heavy) or 'none'}")
+
+if __name__ == '__main__':
+    main()
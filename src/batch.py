@@ -0,0 +1,172 @@
+import copy
+import csv
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from src.config_manager import get_config
+from src.pipeline import PipelineResources, run_pipeline
+
+# Written into a company's output folder once both summaries exist; its presence lets a rerun skip the company
+STATUS_FILE = 'status.json'
+# Clusters and cluster summaries of the last run, so a company's new filing only re-summarizes what it changes
+STATE_FILE = 'summary_state.json'
+REPORT_FILE = 'batch_report.json'
+
+def company_folder_name(company):
+    """Makes a company name safe to use as a folder name."""
+    return re.sub(r'[^A-Za-z0-9._-]+', '_', company).strip('._') or 'company'
+
+def scan_directory(directory):
+    """Groups the PDFs under directory by company.
+
+    Each subfolder is one company (its PDFs at any depth belong to it). PDFs directly in directory
+    are grouped by their file name up to the first underscore, so Apple_10K.pdf and Apple_10Q.pdf
+    both belong to Apple.
+    """
+    jobs = {}
+    for entry in sorted(os.listdir(directory)):
+        path = os.path.join(directory, entry)
+        if os.path.isdir(path):
+            pdfs = sorted(
+                os.path.join(root, name)
+                for root, _, names in os.walk(path) for name in names if name.lower().endswith('.pdf')
+            )
+            if pdfs:
+                jobs.setdefault(entry, []).extend(pdfs)
+        elif entry.lower().endswith('.pdf'):
+            jobs.setdefault(entry.split('_', 1)[0].rsplit('.', 1)[0], []).append(path)
+    return jobs
+
+def load_manifest(manifest_path):
+    """Reads a CSV manifest with company and path columns; relative paths are resolved against the manifest."""
+    jobs = {}
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    with open(manifest_path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.DictReader(f)
+        if not reader.fieldnames or not {'company', 'path'} <= set(reader.fieldnames):
+            raise ValueError(f"Manifest {manifest_path} must have 'company' and 'path' columns.")
+        for row in reader:
+            company, path = row['company'].strip(), row['path'].strip()
+            if not company or not path:
+                continue
+            jobs.setdefault(company, []).append(os.path.join(base_dir, path))
+    return jobs
+
+def discover_jobs(source):
+    """Returns {company: [pdf paths]} from a directory of reports or a CSV manifest."""
+    if os.path.isdir(source):
+        return scan_directory(source)
+    if source.lower().endswith('.csv'):
+        return load_manifest(source)
+    raise ValueError(f"Expected a directory of PDFs or a CSV manifest, got: {source}")
+
+def documents_fingerprint(documents):
+    """Identifies a set of (name, pdf_bytes) documents by name and content, independent of order."""
+    digest = hashlib.sha256()
+    for name, pdf_bytes in sorted(documents):
+        digest.update(name.encode('utf-8'))
+        digest.update(hashlib.sha256(pdf_bytes).digest())
+    return digest.hexdigest()
+
+def read_status(company_dir):
+    try:
+        with open(os.path.join(company_dir, STATUS_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def write_status(company_dir, status):
+    os.makedirs(company_dir, exist_ok=True)
+    path = os.path.join(company_dir, STATUS_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(status, f, indent=2)
+    os.replace(tmp_path, path)
+
+def summarize_company(company, pdf_paths, output_root, resources, force=False, bypass_cache=False):
+    """Runs the pipeline for one company unless its current documents were already summarized.
+
+    When documents were added since the last run, only the clusters the new chunks join are summarized again.
+
+    Returns a dict describing the outcome: status is 'completed', 'skipped' or 'failed'.
+    """
+    start = time.perf_counter()
+    company_dir = os.path.join(output_root, company_folder_name(company))
+    try:
+        documents = []
+        for pdf_path in pdf_paths:
+            with open(pdf_path, 'rb') as f:
+                documents.append((os.path.basename(pdf_path), f.read()))
+        fingerprint = documents_fingerprint(documents)
+        previous = read_status(company_dir)
+        if not force and previous and previous.get('fingerprint') == fingerprint:
+            logging.info(f"Skipping {company}: summaries are up to date")
+            return {'company': company, 'status': 'skipped', 'documents': len(documents), 'pages': 0, 'seconds': 0.0}
+
+        logging.info(f"Summarizing {company} from {len(documents)} documents")
+        result = run_pipeline(documents, output_dir=company_dir, bypass_cache=bypass_cache, resources=resources,
+                              state_path=os.path.join(company_dir, STATE_FILE))
+        seconds = time.perf_counter() - start
+        write_status(company_dir, {
+            'company': company,
+            'fingerprint': fingerprint,
+            'documents': [name for name, _ in documents],
+            'pages': result.num_pages,
+            'chunks': result.num_chunks,
+            'seconds': seconds,
+            'completed_at': datetime.now(timezone.utc).isoformat()
+        })
+        return {'company': company, 'status': 'completed', 'documents': len(documents), 'pages': result.num_pages, 'seconds': seconds}
+    except Exception as e:
+        logging.error(f"Failed to summarize {company}: {str(e)}", exc_info=True)
+        return {'company': company, 'status': 'failed', 'error': str(e), 'documents': len(pdf_paths), 'pages': 0,
+                'seconds': time.perf_counter() - start}
+
+def run_batch(jobs, output_root='output', max_workers=4, force=False, bypass_cache=False, config=None):
+    """Summarizes every company in jobs ({company: [pdf paths]}) with at most max_workers running at once.
+
+    Companies whose documents have not changed since their last successful run are skipped unless
+    force is set, so an interrupted batch resumes where it stopped. Writes batch_report.json to
+    output_root and returns the report. All companies share one spaCy pipeline, cache set and
+    Chroma collection, and PDF_EXTRACTION_WORKERS is divided between the companies running at once.
+    """
+    os.makedirs(output_root, exist_ok=True)
+    # Each running company extracts its PDFs on a process pool of its own, so together they stay within the workers set
+    config = copy.copy(config or get_config())
+    config.pdf_extraction_workers = max(1, config.get_pdf_extraction_workers() // max_workers)
+    resources = PipelineResources(config)
+    start = time.perf_counter()
+    results = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(summarize_company, company, pdf_paths, output_root, resources, force, bypass_cache)
+            for company, pdf_paths in jobs.items()
+        ]
+        for future in as_completed(futures):
+            outcome = future.result()
+            results.append(outcome)
+            logging.info(f"[{len(results)}/{len(futures)}] {outcome['company']}: {outcome['status']} in {outcome['seconds']:.1f}s")
+
+    elapsed = time.perf_counter() - start
+    processed = [outcome for outcome in results if outcome['status'] == 'completed']
+    pages = sum(outcome['pages'] for outcome in processed)
+    report = {
+        'companies': len(results),
+        'completed': len(processed),
+        'skipped': sum(1 for outcome in results if outcome['status'] == 'skipped'),
+        'failed': sorted((outcome for outcome in results if outcome['status'] == 'failed'), key=lambda outcome: outcome['company']),
+        'documents': sum(outcome['documents'] for outcome in processed),
+        'pages': pages,
+        'seconds': elapsed,
+        'companies_per_hour': len(processed) / elapsed * 3600 if elapsed else 0.0,
+        'pages_per_second': pages / elapsed if elapsed else 0.0,
+        'results': sorted(results, key=lambda outcome: outcome['company'])
+    }
+    with open(os.path.join(output_root, REPORT_FILE), 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    return report
@@ -1,20 +1,39 @@
+import hashlib
 import logging
-import chromadb
-from chromadb.config import Settings
-from dotenv import load_dotenv
-import os
+import threading
+from src.config_manager import get_config
+from src.lazy import lazy_import
 
-# Load environment variables from the .env file
-load_dotenv()
+chromadb = lazy_import('chromadb')
 
-# Initialize ChromaDB client with configuration
-client = chromadb.Client(Settings(persist_directory=os.getenv("CHROMADB_PERSIST_DIRECTORY", "./chroma_db")))
+_client = None
+_client_lock = threading.Lock()
 
-# Create or get a collection for embeddings
-def get_or_create_collection(name: str):
+# The ChromaDB client persists collections to disk across runs
+def create_client(path: str):
+    return chromadb.PersistentClient(path=path)
+
+# The process-wide client in CHROMADB_PERSIST_DIRECTORY is opened on first use
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = create_client(get_config().get_chromadb_directory())
+        return _client
+
+# Stable ids: the same chunk of the same document always maps to the same id
+def make_document_hash(pdf_bytes) -> str:
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+def make_chunk_id(document_hash: str, chunk_text: str) -> str:
+    chunk_hash = hashlib.sha256(chunk_text.encode('utf-8')).hexdigest()
+    return f"{document_hash[:32]}-{chunk_hash[:32]}"
+
+# Create or get a collection for embeddings, in the process-wide client unless another is given
+def get_or_create_collection(name: str, client=None):
     try:
         logging.info(f"Getting or creating collection: {name}")
-        return client.get_or_create_collection(name=name)
+        return (client or get_client()).get_or_create_collection(name=name)
     except Exception as e:
         logging.error(f"Failed to get or create collection: {str(e)}", exc_info=True)
         raise RuntimeError(f"Failed to get or create collection: {str(e)}")
@@ -28,11 +47,43 @@ def add_embeddings(collection, ids: list, embeddings: list, metadatas: list):
         logging.error(f"Failed to add embeddings: {str(e)}", exc_info=True)
         raise RuntimeError(f"Failed to add embeddings: {str(e)}")
 
+# Fetch the stored embeddings for whichever of the ids are already in the collection
+def get_stored_embeddings(collection, ids: list) -> dict:
+    try:
+        if not ids:
+            return {}
+        result = collection.get(ids=list(ids), include=["embeddings"])
+        embeddings = result.get('embeddings')
+        if embeddings is None:
+            return {}
+        return {chunk_id: list(embedding) for chunk_id, embedding in zip(result['ids'], embeddings)}
+    except Exception as e:
+        logging.error(f"Failed to get stored embeddings: {str(e)}", exc_info=True)
+        raise RuntimeError(f"Failed to get stored embeddings: {str(e)}")
+
+# Insert or update embeddings, writing each id at most once
+def upsert_embeddings(collection, ids: list, embeddings: list, metadatas: list):
+    try:
+        unique = {}
+        for chunk_id, embedding, metadata in zip(ids, embeddings, metadatas):
+            unique.setdefault(chunk_id, (embedding, metadata))
+        if not unique:
+            return
+        logging.info(f"Upserting {len(unique)} embeddings into collection: {collection.name}")
+        collection.upsert(
+            ids=list(unique),
+            embeddings=[embedding for embedding, _ in unique.values()],
+            metadatas=[metadata for _, metadata in unique.values()]
+        )
+    except Exception as e:
+        logging.error(f"Failed to upsert embeddings: {str(e)}", exc_info=True)
+        raise RuntimeError(f"Failed to upsert embeddings: {str(e)}")
+
 # Query embeddings from the collection
-def query_embeddings(collection, query_embedding: list, top_k: int = 5):
+def query_embeddings(collection, query_embedding: list, top_k: int = 5, where: dict = None):
     try:
         logging.info(f"Querying top {top_k} embeddings from collection: {collection.name}")
-        return collection.query(query_embeddings=[query_embedding], n_results=top_k)
+        return collection.query(query_embeddings=[query_embedding], n_results=top_k, where=where)
     except Exception as e:
         logging.error(f"Failed to query embeddings: {str(e)}", exc_info=True)
         raise RuntimeError(f"Failed to query embeddings: {str(e)}")
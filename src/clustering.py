@@ -0,0 +1,66 @@
+import logging
+from src.lazy import lazy_import
+
+np = lazy_import('numpy')
+sklearn_cluster = lazy_import('sklearn.cluster')
+sklearn_metrics = lazy_import('sklearn.metrics')
+
+# Above this many chunks KMeans is replaced by MiniBatchKMeans
+MINIBATCH_THRESHOLD = 2000
+# Chunks sampled when scoring candidate cluster counts
+SILHOUETTE_SAMPLE_SIZE = 2000
+
+def to_embedding_matrix(embeddings) -> "np.ndarray":
+    """Stacks embeddings into a contiguous float32 matrix of shape (n_chunks, dimensions)."""
+    return np.ascontiguousarray(np.asarray(embeddings, dtype=np.float32))
+
+def _make_model(n_clusters, n_samples, random_state):
+    if n_samples > MINIBATCH_THRESHOLD:
+        return sklearn_cluster.MiniBatchKMeans(n_clusters=n_clusters, random_state=random_state, batch_size=1024)
+    return sklearn_cluster.KMeans(n_clusters=n_clusters, random_state=random_state)
+
+def choose_num_clusters(matrix, min_clusters=2, max_clusters=12, random_state=0):
+    """Picks the cluster count in [min_clusters, max_clusters] with the best silhouette score on a sample."""
+    n_samples = matrix.shape[0]
+    upper = min(max_clusters, n_samples - 1)
+    if upper < max(min_clusters, 2):
+        return max(1, min(min_clusters, n_samples))
+    rng = np.random.default_rng(random_state)
+    sample = matrix
+    if n_samples > SILHOUETTE_SAMPLE_SIZE:
+        sample = matrix[rng.choice(n_samples, SILHOUETTE_SAMPLE_SIZE, replace=False)]
+    best_k, best_score = max(min_clusters, 2), -1.0
+    for k in range(max(min_clusters, 2), upper + 1):
+        labels = _make_model(k, sample.shape[0], random_state).fit_predict(sample)
+        if len(np.unique(labels)) < 2:
+            continue
+        score = sklearn_metrics.silhouette_score(sample, labels)
+        logging.info(f"Silhouette score for {k} clusters: {score:.3f}")
+        if score > best_score:
+            best_k, best_score = k, score
+    return best_k
+
+def group_by_cluster(labels, n_clusters):
+    """Returns, for each cluster id, the chunk indices in that cluster in their original order."""
+    labels = np.asarray(labels)
+    order = np.argsort(labels, kind='stable')
+    counts = np.bincount(labels, minlength=n_clusters)
+    return np.split(order, np.cumsum(counts)[:-1])
+
+def cluster_embeddings(embeddings, num_clusters=None, min_clusters=2, max_clusters=12, random_state=0):
+    """Clusters embeddings and returns (labels, groups).
+
+    num_clusters=None picks the count automatically within [min_clusters, max_clusters].
+    """
+    try:
+        matrix = to_embedding_matrix(embeddings)
+        n_samples = matrix.shape[0]
+        if num_clusters is None:
+            num_clusters = choose_num_clusters(matrix, min_clusters, max_clusters, random_state)
+        n_clusters = max(1, min(num_clusters, n_samples))
+        logging.info(f"Clustering {n_samples} chunks into {n_clusters} clusters")
+        labels = _make_model(n_clusters, n_samples, random_state).fit_predict(matrix)
+        return labels, group_by_cluster(labels, n_clusters)
+    except Exception as e:
+        logging.error(f"Failed to cluster embeddings: {str(e)}", exc_info=True)
+        raise RuntimeError(f"Failed to cluster embeddings: {str(e)}")
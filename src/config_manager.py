@@ -1,20 +1,194 @@
 import os
+import threading
 from dotenv import load_dotenv
 
+_config = None
+_config_lock = threading.Lock()
+
+def get_config():
+    """Returns the process-wide ConfigManager, loading .env and the environment on first use."""
+    global _config
+    with _config_lock:
+        if _config is None:
+            _config = ConfigManager()
+        return _config
+
 class ConfigManager:
+    """The single place configuration is read from .env and environment variables."""
+
     def __init__(self):
         load_dotenv()
         self.api_key = os.getenv("OPENAI_API_KEY")
+        self.openai_base_url = os.getenv("OPENAI_BASE_URL") or None
+        self.llm_backend = os.getenv("LLM_BACKEND", "openai").lower()
+        self.local_llm_latency = float(os.getenv("LOCAL_LLM_LATENCY_SECONDS", 0))
+        self.local_llm_requests_per_minute = int(os.getenv("LOCAL_LLM_REQUESTS_PER_MINUTE", 0)) or None
+        self.metrics_report_dir = os.getenv("METRICS_REPORT_DIRECTORY", "./metrics")
+        self.metrics_port = int(os.getenv("METRICS_PORT", 0))
         self.chromadb_dir = os.getenv("CHROMADB_PERSIST_DIRECTORY", "./chroma_db")
-        self.num_clusters = int(os.getenv("NUM_CLUSTERS", 5))
+        # NUM_CLUSTERS=auto picks the count between MIN_CLUSTERS and MAX_CLUSTERS from the data
+        num_clusters = os.getenv("NUM_CLUSTERS", "5").strip().lower()
+        self.num_clusters = None if num_clusters == "auto" else int(num_clusters)
+        self.min_clusters = int(os.getenv("MIN_CLUSTERS", 2))
+        self.max_clusters = int(os.getenv("MAX_CLUSTERS", 12))
+        self.text_cache_dir = os.getenv("TEXT_CACHE_DIRECTORY", "./cache/text")
+        self.text_cache_max_bytes = int(os.getenv("TEXT_CACHE_MAX_MB", 512)) * 1024 * 1024
+        self.summarization_mode = os.getenv("SUMMARIZATION_MODE", "cluster").lower()
+        self.retrieval_top_k = int(os.getenv("RETRIEVAL_TOP_K", 8))
+        self.summary_max_concurrency = int(os.getenv("SUMMARY_MAX_CONCURRENCY", 5))
+        self.summary_max_retries = int(os.getenv("SUMMARY_MAX_RETRIES", 3))
+        # Largest summary request in tokens, prompt included; larger inputs are summarized in sub-batches and merged
+        self.summary_input_max_tokens = int(os.getenv("SUMMARY_INPUT_MAX_TOKENS", 12000))
+        self.summary_reduce_max_rounds = int(os.getenv("SUMMARY_REDUCE_MAX_ROUNDS", 3))
+        self.response_cache_path = os.getenv("RESPONSE_CACHE_PATH", "./cache/responses.sqlite3")
+        self.response_cache_memory_entries = int(os.getenv("RESPONSE_CACHE_MEMORY_ENTRIES", 256))
+        self.response_cache_disk_entries = int(os.getenv("RESPONSE_CACHE_DISK_ENTRIES", 10000))
+        self.response_cache_ttl_seconds = int(os.getenv("RESPONSE_CACHE_TTL_HOURS", 168)) * 3600
+        self.bypass_response_cache = os.getenv("BYPASS_RESPONSE_CACHE", "false").lower() in ("1", "true", "yes")
+        self.embedding_cache_path = os.getenv("EMBEDDING_CACHE_PATH", "./cache/embeddings.sqlite3")
+        self.embedding_cache_max_entries = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", 200000))
+        self.embedding_batch_size = int(os.getenv("EMBEDDING_BATCH_SIZE", 16))
+        self.embedding_max_workers = int(os.getenv("EMBEDDING_MAX_WORKERS", 4))
+        self.embedding_requests_per_minute = int(os.getenv("EMBEDDING_REQUESTS_PER_MINUTE", 3000))
+        self.embedding_tokens_per_minute = int(os.getenv("EMBEDDING_TOKENS_PER_MINUTE", 1000000))
+        self.chunk_max_tokens = int(os.getenv("CHUNK_MAX_TOKENS", 2000))
+        self.chunk_overlap_tokens = int(os.getenv("CHUNK_OVERLAP_TOKENS", 200))
+        self.dedup_enabled = os.getenv("DEDUP_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.dedup_threshold = float(os.getenv("DEDUP_THRESHOLD", 0.8))
+        self.relevance_keep_ratio = float(os.getenv("RELEVANCE_KEEP_RATIO", 1.0))
+        # Saved clusters are reused only while at least this share of the chunks were already in one
+        self.cluster_reuse_min_share = float(os.getenv("CLUSTER_REUSE_MIN_SHARE", 0.5))
+        self.table_facts_enabled = os.getenv("TABLE_FACTS_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.table_facts_max_lines = int(os.getenv("TABLE_FACTS_MAX_LINES", 200))
+        self.segmentation_mode = os.getenv("SEGMENTATION_MODE", "parser")
+        self.segmentation_processes = int(os.getenv("SEGMENTATION_PROCESSES", 1))
+        self.segmentation_batch_size = int(os.getenv("SEGMENTATION_BATCH_SIZE", 32))
+        self.pdf_extraction_workers = int(os.getenv("PDF_EXTRACTION_WORKERS", os.cpu_count() or 1))
 
     def get_openai_api_key(self):
         if not self.api_key:
             raise RuntimeError("OPENAI_API_KEY not found in environment variables")
         return self.api_key
 
+    def get_openai_base_url(self):
+        return self.openai_base_url
+
+    def get_llm_backend(self):
+        return self.llm_backend
+
+    def get_local_llm_latency(self):
+        return self.local_llm_latency
+
+    def get_local_llm_requests_per_minute(self):
+        return self.local_llm_requests_per_minute
+
+    def get_metrics_report_directory(self):
+        return self.metrics_report_dir
+
+    def get_metrics_port(self):
+        return self.metrics_port
+
     def get_chromadb_directory(self):
         return self.chromadb_dir
 
     def get_num_clusters(self):
         return self.num_clusters
+
+    def get_min_clusters(self):
+        return self.min_clusters
+
+    def get_max_clusters(self):
+        return self.max_clusters
+
+    def get_pdf_extraction_workers(self):
+        return self.pdf_extraction_workers
+
+    def get_text_cache_directory(self):
+        return self.text_cache_dir
+
+    def get_text_cache_max_bytes(self):
+        return self.text_cache_max_bytes
+
+    def get_summarization_mode(self):
+        return self.summarization_mode
+
+    def get_retrieval_top_k(self):
+        return self.retrieval_top_k
+
+    def get_summary_max_concurrency(self):
+        return self.summary_max_concurrency
+
+    def get_summary_max_retries(self):
+        return self.summary_max_retries
+
+    def get_summary_input_max_tokens(self):
+        return self.summary_input_max_tokens
+
+    def get_summary_reduce_max_rounds(self):
+        return self.summary_reduce_max_rounds
+
+    def get_response_cache_path(self):
+        return self.response_cache_path
+
+    def get_response_cache_memory_entries(self):
+        return self.response_cache_memory_entries
+
+    def get_response_cache_disk_entries(self):
+        return self.response_cache_disk_entries
+
+    def get_response_cache_ttl_seconds(self):
+        return self.response_cache_ttl_seconds
+
+    def get_bypass_response_cache(self):
+        return self.bypass_response_cache
+
+    def get_embedding_cache_path(self):
+        return self.embedding_cache_path
+
+    def get_embedding_cache_max_entries(self):
+        return self.embedding_cache_max_entries
+
+    def get_embedding_batch_size(self):
+        return self.embedding_batch_size
+
+    def get_embedding_max_workers(self):
+        return self.embedding_max_workers
+
+    def get_embedding_requests_per_minute(self):
+        return self.embedding_requests_per_minute
+
+    def get_embedding_tokens_per_minute(self):
+        return self.embedding_tokens_per_minute
+
+    def get_chunk_max_tokens(self):
+        return self.chunk_max_tokens
+
+    def get_chunk_overlap_tokens(self):
+        return self.chunk_overlap_tokens
+
+    def get_dedup_enabled(self):
+        return self.dedup_enabled
+
+    def get_dedup_threshold(self):
+        return self.dedup_threshold
+
+    def get_relevance_keep_ratio(self):
+        return self.relevance_keep_ratio
+
+    def get_cluster_reuse_min_share(self):
+        return self.cluster_reuse_min_share
+
+    def get_table_facts_enabled(self):
+        return self.table_facts_enabled
+
+    def get_table_facts_max_lines(self):
+        return self.table_facts_max_lines
+
+    def get_segmentation_mode(self):
+        return self.segmentation_mode
+
+    def get_segmentation_processes(self):
+        return self.segmentation_processes
+
+    def get_segmentation_batch_size(self):
+        return self.segmentation_batch_size
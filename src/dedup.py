@@ -0,0 +1,67 @@
+import logging
+import re
+import zlib
+from src.lazy import lazy_import
+
+np = lazy_import('numpy')
+
+_WORD = re.compile(r'\w+')
+# Largest prime below 2**32: with 32-bit shingle hashes, (a * x + b) mod p never overflows uint64
+_PRIME = 4294967291
+
+class NearDuplicateFilter:
+    """Drops chunks whose MinHash-estimated Jaccard similarity to an earlier chunk reaches threshold.
+
+    Chunks are shingled into word n-grams, signed with num_perm MinHash permutations and indexed
+    with locality-sensitive hashing (bands of num_perm // bands rows), so each new chunk is only
+    compared against the few earlier chunks that share a band.
+    """
+
+    def __init__(self, threshold=0.8, num_perm=128, bands=16, shingle_size=5, seed=0):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands.")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, size=num_perm, dtype=np.uint64)
+        self._buckets = [{} for _ in range(bands)]
+        self._signatures = []
+        self.removed = 0
+
+    def _shingle_hashes(self, text):
+        words = _WORD.findall(text.lower())
+        size = min(self.shingle_size, len(words)) or 1
+        shingles = {' '.join(words[i:i + size]) for i in range(max(len(words) - size + 1, 1))}
+        return np.fromiter((zlib.crc32(shingle.encode('utf-8')) for shingle in shingles), dtype=np.uint64, count=len(shingles))
+
+    def signature(self, text):
+        hashes = self._shingle_hashes(text)
+        permuted = (hashes[:, None] * self._a + self._b) % np.uint64(_PRIME)
+        return permuted.min(axis=0)
+
+    def is_duplicate(self, text):
+        """Returns True if text is a near duplicate of an earlier text, otherwise indexes it and returns False."""
+        signature = self.signature(text)
+        band_keys = [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+        candidates = set()
+        for bucket, key in zip(self._buckets, band_keys):
+            candidates.update(bucket.get(key, ()))
+        for candidate in candidates:
+            if np.mean(self._signatures[candidate] == signature) >= self.threshold:
+                self.removed += 1
+                return True
+        index = len(self._signatures)
+        self._signatures.append(signature)
+        for bucket, key in zip(self._buckets, band_keys):
+            bucket.setdefault(key, []).append(index)
+        return False
+
+    def filter(self, chunks, key=lambda chunk: chunk['text']):
+        """Yields only the chunks that are not near duplicates of an earlier chunk."""
+        for chunk in chunks:
+            if not self.is_duplicate(key(chunk)):
+                yield chunk
+        logging.info(f"Removed {self.removed} near-duplicate chunks")
@@ -0,0 +1,80 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from src.lazy import lazy_import
+
+np = lazy_import('numpy')
+
+class EmbeddingCache:
+    """Persistent SQLite store of embedding vectors keyed by (model, SHA-256 of the text).
+
+    Vectors are stored as raw float32 bytes and the least recently used entries are evicted
+    once the store holds more than max_entries vectors.
+    """
+
+    def __init__(self, db_path, max_entries=200000):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL, last_used REAL NOT NULL, "
+            "PRIMARY KEY (model, text_hash))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def text_hash(text) -> str:
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def get(self, model, text):
+        key = self.text_hash(text)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT vector FROM embeddings WHERE model = ? AND text_hash = ?", (model, key)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?", (time.time(), model, key)
+            )
+            self._conn.commit()
+        return np.frombuffer(row[0], dtype=np.float32).tolist()
+
+    def put_many(self, model, texts, vectors):
+        now = time.time()
+        rows = [
+            (model, self.text_hash(text), np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+        try:
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)", rows
+                )
+                self._evict()
+                self._conn.commit()
+        except Exception as e:
+            logging.error(f"Failed to write embedding cache: {str(e)}", exc_info=True)
+
+    def _evict(self):
+        count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)", (excess,)
+            )
+            logging.info(f"Evicted {excess} entries from the embedding cache")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,94 @@
+import json
+import logging
+import os
+from src.clustering import to_embedding_matrix
+from src.lazy import lazy_import
+from src.openai_utils import EMBEDDING_MODEL, SUMMARY_MODEL
+
+np = lazy_import('numpy')
+
+# Bumped whenever the saved layout or the meaning of a cluster summary changes
+STATE_VERSION = 1
+
+def state_settings(config):
+    """The settings a saved state was made with; a state made with other settings is not reused."""
+    return {
+        'version': STATE_VERSION,
+        'llm_backend': config.get_llm_backend(),
+        'summary_model': SUMMARY_MODEL,
+        'embedding_model': EMBEDDING_MODEL,
+        'num_clusters': config.get_num_clusters(),
+        'min_clusters': config.get_min_clusters(),
+        'max_clusters': config.get_max_clusters(),
+        'summary_input_max_tokens': config.get_summary_input_max_tokens(),
+        # These decide which chunks exist and survive the filters, and so what each cluster contains
+        'segmentation_mode': config.get_segmentation_mode(),
+        'chunk_max_tokens': config.get_chunk_max_tokens(),
+        'chunk_overlap_tokens': config.get_chunk_overlap_tokens(),
+        'dedup_enabled': config.get_dedup_enabled(),
+        'dedup_threshold': config.get_dedup_threshold(),
+        'relevance_keep_ratio': config.get_relevance_keep_ratio()
+    }
+
+def load_state(path, settings):
+    """Returns the clusters saved at path, or None if there are none or they were made with other settings.
+
+    Each cluster is a dict with the ids of its chunks and its summary (None if it failed).
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if state.get('settings') != settings:
+        logging.info(f"Ignoring summarization state at {path}: it was made with different settings")
+        return None
+    return state.get('clusters') or None
+
+def save_state(path, settings, clusters):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'settings': settings, 'clusters': clusters}, f)
+    os.replace(tmp_path, path)
+
+def update_clusters(clusters, chunk_ids, embeddings, min_kept_share=0.5):
+    """Fits the current chunks into clusters saved by an earlier run.
+
+    Chunks that are gone leave their cluster, and chunks no cluster has seen join the cluster with
+    the nearest centroid, the mean embedding of its remaining chunks. Returns (groups, changed): the
+    chunk indices of each saved cluster in chunk order and the set of clusters whose chunks changed.
+    Returns None, so the chunks are clustered afresh, if less than min_kept_share of the current
+    chunks were in a saved cluster: the saved clusters then no longer describe the corpus, as when
+    a new filing replaces an old one that shared only some boilerplate with it.
+    """
+    cluster_of = {chunk_id: index for index, cluster in enumerate(clusters) for chunk_id in cluster['chunk_ids']}
+    groups = [[] for _ in clusters]
+    new_indices = []
+    for position, chunk_id in enumerate(chunk_ids):
+        if chunk_id in cluster_of:
+            groups[cluster_of[chunk_id]].append(position)
+        else:
+            new_indices.append(position)
+    kept_chunks = len(chunk_ids) - len(new_indices)
+    if not kept_chunks or kept_chunks < min_kept_share * len(chunk_ids):
+        logging.info(f"Only {kept_chunks} of {len(chunk_ids)} chunks are in a saved cluster; clustering again")
+        return None
+    kept = [index for index, group in enumerate(groups) if group]
+
+    changed = {
+        index for index, cluster in enumerate(clusters)
+        if {chunk_ids[position] for position in groups[index]} != set(cluster['chunk_ids'])
+    }
+    if new_indices:
+        matrix = to_embedding_matrix(embeddings)
+        centroids = np.stack([matrix[groups[index]].mean(axis=0) for index in kept])
+        new_vectors = matrix[new_indices]
+        # Squared Euclidean distance without its constant |x|^2 term, as one matrix product
+        distances = (centroids ** 2).sum(axis=1) - 2 * new_vectors @ centroids.T
+        for position, nearest in zip(new_indices, distances.argmin(axis=1)):
+            groups[kept[nearest]].append(position)
+            changed.add(kept[nearest])
+        for index in kept:
+            groups[index].sort()
+    return groups, changed
@@ -0,0 +1,33 @@
+import importlib
+import sys
+
+class LazyModule:
+    """Stands in for a module and imports it the first time one of its attributes is used.
+
+    Heavy dependencies (spaCy, scikit-learn, chromadb, the OpenAI SDK, pdfplumber, pandas) are
+    bound through this at module level, so importing a src module or drawing the app's first
+    page does not pay for libraries the current code path never touches.
+    """
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            # import_module holds the import lock, so concurrent first uses import only once
+            module = importlib.import_module(self.__dict__['_name'])
+            self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__['_module'] is not None else "not loaded"
+        return f"<lazy module '{self.__dict__['_name']}' ({state})>"
+
+def lazy_import(name):
+    """Returns the module if it is already imported, otherwise a LazyModule for it."""
+    return sys.modules.get(name) or LazyModule(name)
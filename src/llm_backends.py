@@ -0,0 +1,209 @@
+import asyncio
+import hashlib
+import logging
+import re
+import threading
+import time
+import weakref
+from collections import deque
+from src.metrics import record_tokens
+from src.token_utils import count_tokens
+from src.lazy import lazy_import
+
+np = lazy_import('numpy')
+
+class RetryableBackendError(Exception):
+    """Raised by a backend for transient failures (rate limits, overload) that are safe to retry."""
+    retryable = True
+
+class LLMBackend:
+    """Interface behind generate_summary and generate_embeddings.
+
+    complete/complete_async take chat messages and return the reply text; stream sends the same
+    request and returns an iterator over the reply's text as it is written; embed returns one
+    vector per input text, in input order. aclose releases whatever complete_async opened on the
+    running event loop and is awaited before that loop ends.
+    """
+    name = "base"
+
+    def complete(self, messages, model):
+        raise NotImplementedError
+
+    async def complete_async(self, messages, model):
+        raise NotImplementedError
+
+    def stream(self, messages, model):
+        return iter([self.complete(messages, model)])
+
+    def embed(self, texts, model):
+        raise NotImplementedError
+
+    async def aclose(self):
+        pass
+
+class OpenAIBackend(LLMBackend):
+    name = "openai"
+
+    def __init__(self, api_key, base_url=None):
+        self.api_key = api_key
+        self.base_url = base_url
+        self._client = None
+        # Async clients are bound to the event loop they were created on
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                from openai import OpenAI
+                # Retries are handled by openai_utils so backoff behaves the same for every backend
+                self._client = OpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+            return self._client
+
+    def _async_client(self):
+        from openai import AsyncOpenAI
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+            self._async_clients[loop] = client
+        return client
+
+    async def aclose(self):
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.close()
+
+    @staticmethod
+    def _completion_text(response, model):
+        if response.usage:
+            record_tokens('chat', model, response.usage.prompt_tokens, response.usage.completion_tokens)
+        return response.choices[0].message.content
+
+    def complete(self, messages, model):
+        response = self.client.chat.completions.create(model=model, messages=messages)
+        return self._completion_text(response, model)
+
+    async def complete_async(self, messages, model):
+        response = await self._async_client().chat.completions.create(model=model, messages=messages)
+        return self._completion_text(response, model)
+
+    def stream(self, messages, model):
+        # The request is sent here, so connection and rate-limit errors surface before any text is read
+        response = self.client.chat.completions.create(
+            model=model, messages=messages, stream=True, stream_options={"include_usage": True}
+        )
+        return self._iter_deltas(response, model)
+
+    @staticmethod
+    def _iter_deltas(response, model):
+        for chunk in response:
+            if chunk.usage:
+                record_tokens('chat', model, chunk.usage.prompt_tokens, chunk.usage.completion_tokens)
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    def embed(self, texts, model):
+        response = self.client.embeddings.create(input=texts, model=model)
+        if response.usage:
+            record_tokens('embeddings', model, response.usage.prompt_tokens)
+        # The API reports each vector's input position, which is not guaranteed to match response order
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+_WORD = re.compile(r'[a-z0-9]+')
+_SENTENCE = re.compile(r'(?<=[.!?])\s+')
+_SECTION = re.compile(r'^#{3,4}\s+(.+?)\s*$', re.MULTILINE)
+_STREAM_PIECE = re.compile(r'\s*\S+')
+
+class LocalBackend(LLMBackend):
+    """Deterministic offline stand-in for benchmarking and tests.
+
+    Embeddings are L2-normalised hashed bag-of-words vectors, so texts sharing words end up close
+    together. Completions echo the template's "####" sections with the input sentences that share the
+    most words with each section title. latency adds a fixed delay per call, and requests_per_minute
+    makes calls beyond the limit fail with a retryable error, as a rate-limited API would.
+    """
+    name = "local"
+
+    def __init__(self, latency=0.0, requests_per_minute=None, dimensions=1536):
+        self.latency = latency
+        self.requests_per_minute = requests_per_minute
+        self.dimensions = dimensions
+        self._request_times = deque()
+        self._lock = threading.Lock()
+
+    def _check_rate_limit(self):
+        if not self.requests_per_minute:
+            return
+        now = time.monotonic()
+        with self._lock:
+            while self._request_times and now - self._request_times[0] > 60:
+                self._request_times.popleft()
+            if len(self._request_times) >= self.requests_per_minute:
+                raise RetryableBackendError("Simulated rate limit exceeded (429)")
+            self._request_times.append(now)
+
+    def _embed_one(self, text):
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for word in _WORD.findall(text.lower()):
+            digest = int.from_bytes(hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest(), 'little')
+            vector[digest % self.dimensions] += 1.0 if (digest >> 63) else -1.0
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            vector[0] = 1.0
+            norm = 1.0
+        return (vector / norm).tolist()
+
+    def _summarize(self, messages):
+        prompt = messages[-1]['content']
+        sentences = [sentence.strip() for sentence in _SENTENCE.split(prompt) if sentence.strip()]
+        titles = _SECTION.findall(prompt)
+        if not titles:
+            return " ".join(sentences[:5])
+        lines = []
+        for title in titles:
+            title_words = set(_WORD.findall(title.lower()))
+            ranked = sorted(sentences, key=lambda sentence: len(title_words & set(_WORD.findall(sentence.lower()))), reverse=True)
+            lines.append(f"#### {title}")
+            lines.extend(f"- {sentence[:300]}" for sentence in ranked[:2])
+        return "\n".join(lines)
+
+    def _reply(self, messages, model):
+        reply = self._summarize(messages)
+        # Token counts are estimated so benchmarks can report usage as they would against the API
+        prompt_tokens = sum(count_tokens(message['content']) for message in messages)
+        record_tokens('chat', model, prompt_tokens, count_tokens(reply))
+        return reply
+
+    def complete(self, messages, model):
+        self._check_rate_limit()
+        if self.latency:
+            time.sleep(self.latency)
+        return self._reply(messages, model)
+
+    async def complete_async(self, messages, model):
+        self._check_rate_limit()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._reply(messages, model)
+
+    def stream(self, messages, model):
+        return iter(_STREAM_PIECE.findall(self.complete(messages, model)))
+
+    def embed(self, texts, model):
+        self._check_rate_limit()
+        if self.latency:
+            time.sleep(self.latency)
+        record_tokens('embeddings', model, sum(count_tokens(text) for text in texts))
+        return [self._embed_one(text) for text in texts]
+
+def create_backend(name, api_key=None, base_url=None, latency=0.0, requests_per_minute=None):
+    if name == "openai":
+        if not api_key:
+            raise RuntimeError("OPENAI_API_KEY not found in environment variables")
+        return OpenAIBackend(api_key, base_url=base_url)
+    if name == "local":
+        logging.info("Using the local deterministic LLM backend")
+        return LocalBackend(latency=latency, requests_per_minute=requests_per_minute)
+    raise ValueError(f"Unknown LLM backend: {name}. Expected 'openai' or 'local'.")
@@ -0,0 +1,232 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.stage_timer import StageTimer
+
+# The run being measured and the stage currently running. Context variables follow asyncio tasks
+# automatically; thread pools must submit work through contextvars.copy_context().run
+_active_run = ContextVar('active_run', default=None)
+_current_stage = ContextVar('current_stage', default='unstaged')
+
+def _llm_entry():
+    return {'calls': 0, 'failures': 0, 'seconds': 0.0, 'prompt_tokens': 0, 'completion_tokens': 0}
+
+def _cache_entry():
+    return {'hits': 0, 'misses': 0}
+
+class RunMetrics(StageTimer):
+    """Stage timings plus LLM calls, token usage and cache hit rates of one pipeline run.
+
+    LLM and cache counters are attributed to the stage that was running when they were recorded.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.run_id = uuid.uuid4().hex[:12]
+        self.started_at = datetime.now(timezone.utc)
+        self.total_seconds = None
+        self.llm = defaultdict(_llm_entry)  # (stage, operation, model) -> counters
+        self.cache = defaultdict(_cache_entry)  # (stage, cache name) -> counters
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        token = _current_stage.set(name)
+        try:
+            with super().stage(name):
+                yield
+        finally:
+            _current_stage.reset(token)
+
+    @contextmanager
+    def activate(self):
+        """Makes this the run that llm_call, record_tokens and record_cache report to."""
+        token = _active_run.set(self)
+        try:
+            yield self
+        finally:
+            _active_run.reset(token)
+
+    def finish(self):
+        self.total_seconds = time.perf_counter() - self._start
+        REGISTRY.add(self)
+
+    def to_dict(self):
+        stages = {name: dict(timing) for name, timing in self.report().items()}
+        with self._lock:
+            llm = {key: dict(entry) for key, entry in self.llm.items()}
+            cache = {key: dict(entry) for key, entry in self.cache.items()}
+        for stage in {key[0] for key in list(llm) + list(cache)}:
+            stages.setdefault(stage, {'seconds': 0.0, 'items': 0})
+        for timing in stages.values():
+            timing.update({'llm_calls': 0, 'llm_seconds': 0.0, 'prompt_tokens': 0, 'completion_tokens': 0,
+                           'cache_hits': 0, 'cache_misses': 0})
+        for (stage, _, _), entry in llm.items():
+            stages[stage]['llm_calls'] += entry['calls']
+            stages[stage]['llm_seconds'] += entry['seconds']
+            stages[stage]['prompt_tokens'] += entry['prompt_tokens']
+            stages[stage]['completion_tokens'] += entry['completion_tokens']
+        for (stage, _), entry in cache.items():
+            stages[stage]['cache_hits'] += entry['hits']
+            stages[stage]['cache_misses'] += entry['misses']
+        for timing in stages.values():
+            lookups = timing['cache_hits'] + timing['cache_misses']
+            timing['cache_hit_rate'] = timing['cache_hits'] / lookups if lookups else None
+        return {
+            'run_id': self.run_id,
+            'started_at': self.started_at.isoformat(),
+            'total_seconds': self.total_seconds,
+            'stages': stages,
+            'llm_calls': [
+                {'stage': stage, 'operation': operation, 'model': model, **entry}
+                for (stage, operation, model), entry in llm.items()
+            ],
+            'caches': [
+                {'stage': stage, 'cache': name, **entry,
+                 'hit_rate': entry['hits'] / (entry['hits'] + entry['misses']) if entry['hits'] + entry['misses'] else None}
+                for (stage, name), entry in cache.items()
+            ],
+            'totals': {
+                'llm_calls': sum(entry['calls'] for entry in llm.values()),
+                'llm_seconds': sum(entry['seconds'] for entry in llm.values()),
+                'prompt_tokens': sum(entry['prompt_tokens'] for entry in llm.values()),
+                'completion_tokens': sum(entry['completion_tokens'] for entry in llm.values())
+            }
+        }
+
+    def write_report(self, report_dir):
+        """Writes the run as JSON to report_dir and returns the file path."""
+        os.makedirs(report_dir, exist_ok=True)
+        path = os.path.join(report_dir, f"run-{self.started_at:%Y%m%dT%H%M%S}-{self.run_id}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        logging.info(f"Wrote run metrics report to {path}")
+        return path
+
+@contextmanager
+def llm_call(operation, model):
+    """Times one LLM request (a single attempt, retries are separate calls) for the active run."""
+    run = _active_run.get()
+    start = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        if run is not None:
+            with run._lock:
+                entry = run.llm[(_current_stage.get(), operation, model)]
+                entry['calls'] += 1
+                entry['failures'] += int(failed)
+                entry['seconds'] += time.perf_counter() - start
+
+def record_tokens(operation, model, prompt_tokens, completion_tokens=0):
+    run = _active_run.get()
+    if run is None:
+        return
+    with run._lock:
+        entry = run.llm[(_current_stage.get(), operation, model)]
+        entry['prompt_tokens'] += prompt_tokens or 0
+        entry['completion_tokens'] += completion_tokens or 0
+
+def record_cache(name, hit):
+    run = _active_run.get()
+    if run is None:
+        return
+    with run._lock:
+        run.cache[(_current_stage.get(), name)]['hits' if hit else 'misses'] += 1
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class MetricsRegistry:
+    """Process-wide totals over every finished run, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self.runs = 0
+        self.stage_seconds = defaultdict(float)
+        self.llm = defaultdict(_llm_entry)
+        self.cache = defaultdict(_cache_entry)
+        self._lock = threading.Lock()
+
+    def add(self, run):
+        with self._lock, run._lock:
+            self.runs += 1
+            for stage, seconds in run.seconds.items():
+                self.stage_seconds[stage] += seconds
+            for key, entry in run.llm.items():
+                for field, value in entry.items():
+                    self.llm[key][field] += value
+            for key, entry in run.cache.items():
+                for field, value in entry.items():
+                    self.cache[key][field] += value
+
+    def to_prometheus(self):
+        lines = []
+
+        def metric(name, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{_escape(label)}"' for key, label in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+        with self._lock:
+            metric("summarizer_runs_total", "Finished pipeline runs.", [({}, self.runs)])
+            metric("summarizer_stage_seconds_total", "Wall time spent in each pipeline stage.",
+                   [({'stage': stage}, seconds) for stage, seconds in self.stage_seconds.items()])
+            llm_labels = [({'stage': stage, 'operation': operation, 'model': model}, entry)
+                          for (stage, operation, model), entry in self.llm.items()]
+            metric("summarizer_llm_calls_total", "LLM requests, including retried attempts.",
+                   [(labels, entry['calls']) for labels, entry in llm_labels])
+            metric("summarizer_llm_failures_total", "LLM requests that raised an error.",
+                   [(labels, entry['failures']) for labels, entry in llm_labels])
+            metric("summarizer_llm_seconds_total", "Time spent waiting on LLM requests.",
+                   [(labels, entry['seconds']) for labels, entry in llm_labels])
+            metric("summarizer_llm_tokens_total", "Tokens sent to and received from the LLM.",
+                   [({**labels, 'kind': kind}, entry[f"{kind}_tokens"]) for labels, entry in llm_labels
+                    for kind in ('prompt', 'completion')])
+            metric("summarizer_cache_lookups_total", "Cache lookups by cache and result.",
+                   [({'stage': stage, 'cache': name, 'result': result}, entry[field])
+                    for (stage, name), entry in self.cache.items() for result, field in (('hit', 'hits'), ('miss', 'misses'))])
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry()
+_servers = {}
+_servers_lock = threading.Lock()
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = REGISTRY.to_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_metrics_server(port, host='0.0.0.0'):
+    """Serves REGISTRY at http://host:port/metrics from a background thread; repeated calls reuse the server."""
+    with _servers_lock:
+        if port not in _servers:
+            server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            _servers[port] = server
+            logging.info(f"Serving metrics on port {server.server_port}")
+        return _servers[port]
@@ -1,49 +1,316 @@
+import asyncio
+import contextvars
 import logging
-import os
-from openai import OpenAI
-from dotenv import load_dotenv
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from src.config_manager import get_config
+from src.llm_backends import create_backend
+from src.metrics import llm_call, record_cache
+from src.token_utils import count_tokens
+from src.lazy import lazy_import
 
-# Load environment variables from the .env file
-load_dotenv()
+openai = lazy_import('openai')
 
-# Initialize OpenAI API client with the API key from the environment variable
-api_key = os.getenv("OPENAI_API_KEY")
-if not api_key:
-    raise RuntimeError("OPENAI_API_KEY not found in environment variables")
+_backend = None
+_backend_lock = threading.Lock()
 
-client = OpenAI(api_key=api_key)
+def backend_from_config(config):
+    """Creates the LLM backend that config's LLM_BACKEND selects."""
+    return create_backend(
+        config.get_llm_backend(),
+        api_key=config.api_key,
+        base_url=config.get_openai_base_url(),
+        latency=config.get_local_llm_latency(),
+        requests_per_minute=config.get_local_llm_requests_per_minute()
+    )
 
-def generate_summary(text, template):
+def get_backend():
+    """Returns the process-wide LLM backend selected by LLM_BACKEND, creating it on first use."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = backend_from_config(get_config())
+        return _backend
+
+def set_backend(backend):
+    """Replaces the process-wide backend, e.g. with a LocalBackend for benchmarks."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+def _cache_model(backend, model):
+    # Responses from stand-in backends must never be served as real model output
+    return model if backend.name == "openai" else f"{backend.name}:{model}"
+
+SUMMARY_MODEL = "gpt-4o-mini"
+SUMMARY_SYSTEM_PROMPT = "You are a senior financial analyst with over 20 years of experience in evaluating company financials, including 10-K reports and financial analyst reports. Your goal is to create comprehensive and concise summaries that are insightful and actionable for financial advisors. Ensure that the summary adheres to the specified format and includes all key details."
+
+EMBEDDING_MODEL = "text-embedding-ada-002"
+# Request limits of the embeddings endpoint
+EMBEDDING_MAX_INPUTS_PER_REQUEST = 2048
+EMBEDDING_MAX_INPUT_TOKENS = 8191
+EMBEDDING_MAX_TOKENS_PER_REQUEST = 300000
+
+class RateLimiter:
+    """Client-side token bucket limiting requests and tokens per minute across threads."""
+
+    def __init__(self, requests_per_minute, tokens_per_minute=None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._request_allowance = float(requests_per_minute)
+        self._token_allowance = float(tokens_per_minute) if tokens_per_minute else None
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self._request_allowance = min(self.requests_per_minute, self._request_allowance + elapsed * self.requests_per_minute / 60)
+        if self._token_allowance is not None:
+            self._token_allowance = min(self.tokens_per_minute, self._token_allowance + elapsed * self.tokens_per_minute / 60)
+
+    def acquire(self, tokens=0):
+        if self._token_allowance is not None:
+            # A single request larger than the whole bucket is allowed through once the bucket is full
+            tokens = min(tokens, self.tokens_per_minute)
+        while True:
+            with self._lock:
+                self._refill()
+                tokens_ready = self._token_allowance is None or self._token_allowance >= tokens
+                if self._request_allowance >= 1 and tokens_ready:
+                    self._request_allowance -= 1
+                    if self._token_allowance is not None:
+                        self._token_allowance -= tokens
+                    return
+                wait = (1 - self._request_allowance) * 60 / self.requests_per_minute if self._request_allowance < 1 else 0
+                if not tokens_ready:
+                    wait = max(wait, (tokens - self._token_allowance) * 60 / self.tokens_per_minute)
+            time.sleep(max(wait, 0.01))
+
+def _is_retryable(error):
+    if getattr(error, 'retryable', False):
+        return True
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+def _call_with_retries(func, max_retries=5, base_delay=1.0, max_delay=30.0):
+    """Calls func, retrying rate-limit, connection and 5xx errors with exponential backoff and jitter."""
+    for attempt in range(max_retries + 1):
+        try:
+            return func()
+        except Exception as e:
+            if attempt == max_retries or not _is_retryable(e):
+                raise
+            delay = min(max_delay, base_delay * (2 ** attempt)) * random.uniform(0.5, 1.0)
+            logging.warning(f"OpenAI request failed ({str(e)}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+async def _call_with_retries_async(func, max_retries=5, base_delay=1.0, max_delay=30.0):
+    """Async counterpart of _call_with_retries; func is a coroutine function."""
+    for attempt in range(max_retries + 1):
+        try:
+            return await func()
+        except Exception as e:
+            if attempt == max_retries or not _is_retryable(e):
+                raise
+            delay = min(max_delay, base_delay * (2 ** attempt)) * random.uniform(0.5, 1.0)
+            logging.warning(f"OpenAI request failed ({str(e)}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+def _summary_messages(text, template):
+    return [
+        {
+            "role": "system",
+            "content": SUMMARY_SYSTEM_PROMPT
+        },
+        {
+            "role": "user",
+            "content": f"{template}\n\n{text}"
+        }
+    ]
+
+def _complete(backend, text, template):
+    with llm_call('chat', SUMMARY_MODEL):
+        return backend.complete(_summary_messages(text, template), SUMMARY_MODEL)
+
+async def _complete_async(backend, text, template):
+    with llm_call('chat', SUMMARY_MODEL):
+        return await backend.complete_async(_summary_messages(text, template), SUMMARY_MODEL)
+
+def _cached_summary(cache, bypass_cache, text, template, backend):
+    if cache is None:
+        return None, None
+    key = cache.make_key(_cache_model(backend, SUMMARY_MODEL), SUMMARY_SYSTEM_PROMPT, template, text)
+    # Bypassing skips the lookup but still stores the fresh response
+    cached = None if bypass_cache else cache.get(key)
+    if not bypass_cache:
+        record_cache('response', cached is not None)
+    if cached is not None:
+        logging.info("Summary served from response cache")
+    return key, cached
+
+def generate_summary(text, template, cache=None, bypass_cache=False, max_retries=3, backend=None):
+    backend = backend or get_backend()
     try:
         logging.info("Generating summary")
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a senior financial analyst with over 20 years of experience in evaluating company financials, including 10-K reports and financial analyst reports. Your goal is to create comprehensive and concise summaries that are insightful and actionable for financial advisors. Ensure that the summary adheres to the specified format and includes all key details."
-                },
-                {
-                    "role": "user",
-                    "content": f"{template}\n\n{text}"
-                }
-            ]
+        key, cached = _cached_summary(cache, bypass_cache, text, template, backend)
+        if cached is not None:
+            return cached
+        summary = _call_with_retries(
+            lambda: _complete(backend, text, template),
+            max_retries=max_retries
         )
         logging.info("Summary generated successfully")
-        return response.choices[0].message.content
+        if cache is not None:
+            cache.set(key, summary)
+        return summary
     except Exception as e:
         logging.error(f"Failed to generate summary: {str(e)}", exc_info=True)
         raise RuntimeError(f"Failed to generate summary: {str(e)}")
 
-def generate_embeddings(text):
+def generate_summary_stream(text, template, cache=None, bypass_cache=False, max_retries=3, backend=None):
+    """Like generate_summary, but yields the summary in pieces as the model writes it.
+
+    Retries only cover opening the stream. The complete summary is cached once the stream ends,
+    and a cached summary is yielded as a single piece.
+    """
+    backend = backend or get_backend()
+    try:
+        logging.info("Streaming summary")
+        key, cached = _cached_summary(cache, bypass_cache, text, template, backend)
+        if cached is not None:
+            yield cached
+            return
+        pieces = []
+        with llm_call('chat', SUMMARY_MODEL):
+            stream = _call_with_retries(
+                lambda: backend.stream(_summary_messages(text, template), SUMMARY_MODEL),
+                max_retries=max_retries
+            )
+            for piece in stream:
+                pieces.append(piece)
+                yield piece
+        logging.info("Summary streamed successfully")
+        if cache is not None:
+            cache.set(key, "".join(pieces))
+    except Exception as e:
+        logging.error(f"Failed to stream summary: {str(e)}", exc_info=True)
+        raise RuntimeError(f"Failed to stream summary: {str(e)}")
+
+async def generate_summaries_async(requests, max_concurrency=5, max_retries=3, cache=None, bypass_cache=False, backend=None):
+    """Summarizes (text, template) pairs concurrently, at most max_concurrency at a time.
+
+    Returns summaries in request order. A request that still fails after its retries is logged
+    and returned as None so the caller can continue with a partial result.
+    """
+    backend = backend or get_backend()
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def summarize(index, text, template):
+        key, cached = _cached_summary(cache, bypass_cache, text, template, backend)
+        if cached is not None:
+            return cached
+        async with semaphore:
+            try:
+                summary = await _call_with_retries_async(
+                    lambda: _complete_async(backend, text, template),
+                    max_retries=max_retries
+                )
+                if cache is not None:
+                    cache.set(key, summary)
+                return summary
+            except Exception as e:
+                logging.error(f"Failed to generate summary {index + 1} of {len(requests)}: {str(e)}", exc_info=True)
+                return None
+
+    logging.info(f"Generating {len(requests)} summaries with up to {max_concurrency} in flight")
+    try:
+        return await asyncio.gather(*(summarize(i, text, template) for i, (text, template) in enumerate(requests)))
+    finally:
+        # generate_summaries runs each call on a fresh event loop, so the loop's client must not outlive it
+        await backend.aclose()
+
+def generate_summaries(requests, max_concurrency=5, max_retries=3, cache=None, bypass_cache=False, backend=None):
+    """Synchronous entry point for generate_summaries_async."""
+    return asyncio.run(generate_summaries_async(requests, max_concurrency=max_concurrency, max_retries=max_retries,
+                                                cache=cache, bypass_cache=bypass_cache, backend=backend))
+
+def generate_embeddings(text, backend=None):
+    backend = backend or get_backend()
     try:
         logging.info("Generating embeddings")
-        response = client.embeddings.create(
-            input=text,
-            model="text-embedding-ada-002"
-        )
+        with llm_call('embeddings', EMBEDDING_MODEL):
+            embedding = backend.embed([text], EMBEDDING_MODEL)[0]
         logging.info("Embeddings generated successfully")
-        return response.data[0].embedding
+        return embedding
+    except Exception as e:
+        logging.error(f"Failed to generate embeddings: {str(e)}", exc_info=True)
+        raise RuntimeError(f"Failed to generate embeddings: {str(e)}")
+
+def _embed_batch(backend, batch_texts, batch_tokens, model, rate_limiter, max_retries):
+    def request():
+        if rate_limiter:
+            rate_limiter.acquire(batch_tokens)
+        with llm_call('embeddings', model):
+            return backend.embed(batch_texts, model)
+
+    return _call_with_retries(request, max_retries=max_retries)
+
+def generate_embeddings_batch(texts, model=EMBEDDING_MODEL, max_workers=4, max_batch_size=EMBEDDING_MAX_INPUTS_PER_REQUEST,
+                              max_batch_tokens=EMBEDDING_MAX_TOKENS_PER_REQUEST, rate_limiter=None, max_retries=5, cache=None,
+                              backend=None):
+    """Embeds texts with several inputs per request and several requests in flight, returning vectors in input order.
+
+    texts may be any iterable, including a generator: batches are sent as soon as they fill up,
+    so embedding overlaps with whatever is still producing the texts. When an EmbeddingCache is
+    given it is consulted first and only cache misses are sent to the API.
+    """
+    backend = backend or get_backend()
+    cache_model = _cache_model(backend, model)
+    try:
+        logging.info("Generating embeddings in batches")
+        embeddings = []
+        pending = []
+        cache_hits = 0
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            batch_indices = []
+            batch_texts = []
+            batch_tokens = 0
+
+            def submit_batch():
+                # Run in a copy of the caller's context so the worker's calls count toward the caller's stage
+                future = executor.submit(contextvars.copy_context().run, _embed_batch, backend, batch_texts, batch_tokens, model, rate_limiter, max_retries)
+                pending.append((batch_indices, batch_texts, future))
+
+            for text in texts:
+                cached = cache.get(cache_model, text) if cache else None
+                embeddings.append(cached)
+                if cache:
+                    record_cache('embedding', cached is not None)
+                if cached is not None:
+                    cache_hits += 1
+                    continue
+                tokens = count_tokens(text, model)
+                if batch_texts and (len(batch_texts) >= max_batch_size or batch_tokens + tokens > max_batch_tokens):
+                    submit_batch()
+                    batch_indices, batch_texts, batch_tokens = [], [], 0
+                batch_indices.append(len(embeddings) - 1)
+                batch_texts.append(text)
+                batch_tokens += tokens
+            if batch_texts:
+                submit_batch()
+            for indices, sent_texts, future in pending:
+                vectors = future.result()
+                for index, vector in zip(indices, vectors):
+                    embeddings[index] = vector
+                if cache:
+                    cache.put_many(cache_model, sent_texts, vectors)
+        logging.info(f"Generated {len(embeddings)} embeddings ({cache_hits} from cache) in {len(pending)} requests")
+        return embeddings
     except Exception as e:
         logging.error(f"Failed to generate embeddings: {str(e)}", exc_info=True)
         raise RuntimeError(f"Failed to generate embeddings: {str(e)}")
@@ -1,20 +1,81 @@
+import io
 import logging
-import pdfplumber
-from typing import List
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List
+from src.lazy import lazy_import
+
+pdfplumber = lazy_import('pdfplumber')
+
+# Each worker gets several small page ranges so results can be yielded in order while later ranges are still running
+RANGES_PER_WORKER = 4
+
+def _pool_context():
+    # Forking would copy the locks held by the embedding threads, Streamlit or other batch companies into each worker
+    start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(start_method)
+
+def open_pdf(source):
+    """Opens a PDF given as a path, bytes, bytearray, memoryview or binary file object."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        # BytesIO shares the buffer of a bytes object until written to; bytearray and memoryview are copied
+        return pdfplumber.open(io.BytesIO(source))
+    return pdfplumber.open(source)
+
+# The PDF each extraction worker process reads from, sent once when the worker starts
+_worker_source = None
+_worker_collect_tables = False
+
+def _init_worker(source, collect_tables=False):
+    global _worker_source, _worker_collect_tables
+    _worker_source = source
+    _worker_collect_tables = collect_tables
+
+def _extract_page_range(start, end) -> List[tuple]:
+    """Extracts (text, raw tables) of pages [start, end) in a worker process that opens the PDF on its own."""
+    extractor = PDFExtractor(_worker_source, collect_tables=_worker_collect_tables)
+    with open_pdf(_worker_source) as pdf:
+        return [extractor._extract_page(page) for page in pdf.pages[start:end]]
 
 class PDFExtractor:
-    def __init__(self, file_path):
-        self.file_path = file_path
+    def __init__(self, source, num_workers=1, collect_tables=False):
+        """source is a file path, the PDF's bytes (bytes, bytearray or memoryview) or a binary file object.
+
+        With collect_tables, the raw rows of every table are kept in self.tables as
+        (page_number, page_text, raw_tables) while the text is extracted, so a PDF is parsed only once.
+        """
+        self.source = source
+        self.num_workers = max(1, int(num_workers))
+        self.collect_tables = collect_tables
+        self.tables = []
+
+    def _describe_source(self):
+        if isinstance(self.source, (str, os.PathLike)):
+            return str(self.source)
+        return getattr(self.source, 'name', None) or "in-memory PDF"
+
+    def _picklable_source(self):
+        """The source in a form that can be sent to worker processes."""
+        if isinstance(self.source, (str, os.PathLike, bytes)):
+            return self.source
+        if isinstance(self.source, (bytearray, memoryview)):
+            return bytes(self.source)
+        if hasattr(self.source, 'getvalue'):
+            return self.source.getvalue()
+        # Read the whole file, then put the position back where the caller left it
+        position = self.source.tell()
+        try:
+            self.source.seek(0)
+            return self.source.read()
+        finally:
+            self.source.seek(position)
 
     def extract_text(self) -> str:
-        logging.info(f"Extracting text from PDF: {self.file_path}")
+        logging.info(f"Extracting text from PDF: {self._describe_source()}")
         try:
-            with pdfplumber.open(self.file_path) as pdf:
-                text = ''
-                for page in pdf.pages:
-                    page_text = self._extract_page_text(page)
-                    if page_text:
-                        text += page_text
+            text = ''.join(page_text for page_text in self.iter_pages() if page_text)
             if not text:
                 raise ValueError("No text found in PDF.")
             return text
@@ -22,15 +83,67 @@ class PDFExtractor:
             logging.error(f"Failed to extract text from PDF: {str(e)}", exc_info=True)
             raise RuntimeError(f"Failed to extract text from PDF: {str(e)}")
 
-    def _extract_page_text(self, page) -> str:
+    def iter_pages(self) -> Iterator[str]:
+        """Lazily yields the text of each page in page order."""
+        self.tables = []
+        pages = self._iter_pages_parallel() if self.num_workers > 1 else self._iter_pages_serial()
+        for page_number, (page_text, raw_tables) in enumerate(pages, start=1):
+            if raw_tables:
+                self.tables.append((page_number, page_text, raw_tables))
+            yield page_text
+
+    def _iter_pages_serial(self) -> Iterator[tuple]:
+        with open_pdf(self.source) as pdf:
+            for page in pdf.pages:
+                yield self._extract_page(page)
+                # Drop the parsed layout objects so only the current page is held in memory
+                page.flush_cache()
+
+    def _iter_pages_parallel(self) -> Iterator[tuple]:
+        with open_pdf(self.source) as pdf:
+            page_count = len(pdf.pages)
+        if page_count == 0:
+            return
+        ranges = self._split_page_range(page_count, self.num_workers * RANGES_PER_WORKER)
+        logging.info(f"Extracting {page_count} pages with {min(self.num_workers, len(ranges))} worker processes")
+        # Workers receive the path or the PDF's bytes once at start-up rather than with every range
+        with ProcessPoolExecutor(max_workers=min(self.num_workers, len(ranges)), mp_context=_pool_context(),
+                                 initializer=_init_worker, initargs=(self._picklable_source(), self.collect_tables)) as executor:
+            # Keep a bounded window of ranges in flight and yield them in submission order
+            pending = deque()
+            next_range = 0
+            while next_range < len(ranges) or pending:
+                while next_range < len(ranges) and len(pending) < self.num_workers * 2:
+                    start, end = ranges[next_range]
+                    pending.append(executor.submit(_extract_page_range, start, end))
+                    next_range += 1
+                yield from pending.popleft().result()
+
+    @staticmethod
+    def _split_page_range(page_count, num_workers):
+        num_workers = max(1, min(num_workers, page_count))
+        size, remainder = divmod(page_count, num_workers)
+        ranges = []
+        start = 0
+        for i in range(num_workers):
+            end = start + size + (1 if i < remainder else 0)
+            if end > start:
+                ranges.append((start, end))
+            start = end
+        return ranges
+
+    def _extract_page(self, page) -> tuple:
+        """Returns the page's text and, when collecting tables, the raw rows of its tables."""
+        raw_tables = page.extract_tables() if self.collect_tables else []
         page_text = page.extract_text()
         if not page_text:
-            page_text = self._extract_text_from_tables(page)
-        return page_text
+            page_text = self._text_from_tables(raw_tables if self.collect_tables else page.extract_tables())
+        return page_text or '', raw_tables
 
-    def _extract_text_from_tables(self, page) -> str:
+    @staticmethod
+    def _text_from_tables(raw_tables) -> str:
         text = ''
-        for table in page.extract_tables():
+        for table in raw_tables:
             for row in table:
                 text += ' '.join([str(cell) for cell in row if cell]) + '\n'
         return text
@@ -0,0 +1,489 @@
+import json
+import logging
+import os
+import threading
+from collections import Counter
+from functools import partial
+from itertools import islice
+from src.config_manager import get_config
+from src.pdf_extractor import PDFExtractor
+from src.text_processor import TextProcessor
+from src.text_cache import TextCache
+from src.embedding_cache import EmbeddingCache
+from src.response_cache import ResponseCache
+from src.openai_utils import (
+    backend_from_config, generate_summary_stream, generate_embeddings_batch, RateLimiter, EMBEDDING_MAX_INPUT_TOKENS, SUMMARY_MODEL
+)
+from src.chromadb_utils import (
+    create_client, get_or_create_collection, get_stored_embeddings, upsert_embeddings,
+    make_document_hash, make_chunk_id
+)
+from src.templates import template_2_page, template_1_page
+from src.retrieval_summarizer import summarize_by_section
+from src.reduce import fit_to_budget, reduce_groups, text_budget, trim_to_budget
+from src.incremental import load_state, save_state, state_settings, update_clusters
+from src.clustering import cluster_embeddings
+from src.dedup import NearDuplicateFilter
+from src.relevance import filter_relevant_chunks
+from src.metrics import RunMetrics, record_cache
+from src.table_extractor import TableExtractor, build_facts, tables_from_pages, tables_to_json, tables_from_json
+from src.lazy import lazy_import
+from src.token_utils import count_tokens
+
+# python-docx is only needed once the summaries are ready
+docx_utils = lazy_import('src.docx_utils')
+
+COLLECTION_NAME = 'financial_report_embeddings'
+
+class PipelineResult:
+    """Outcome of one run_pipeline call.
+
+    notices holds (level, message) pairs such as ('warning', ...) for the caller to display, and
+    metrics holds the stage timings, LLM usage and cache hit rates of the run.
+    """
+
+    def __init__(self, summary_2_page, summary_1_page, output_paths, num_pages, num_chunks, num_new_chunks, notices, metrics):
+        self.summary_2_page = summary_2_page
+        self.summary_1_page = summary_1_page
+        self.output_paths = output_paths
+        self.num_pages = num_pages
+        self.num_chunks = num_chunks
+        self.num_new_chunks = num_new_chunks
+        self.notices = notices
+        self.metrics = metrics
+
+def record_items(items, on_complete):
+    """Passes items through unchanged and hands the full list to on_complete once the iterable is exhausted."""
+    recorded = []
+    for item in items:
+        recorded.append(item)
+        yield item
+    on_complete(recorded)
+
+def cache_extraction(text_cache, cache_key, extractor, page_counts, source, pages):
+    """Caches a document's extracted pages, its page count and, when they were collected, its typed tables."""
+    page_counts[source] = len(pages)
+    text_cache.set_pages(cache_key, pages)
+    text_cache.set(cache_key, 'page_count', str(len(pages)))
+    if extractor.collect_tables:
+        text_cache.set(cache_key, 'tables', tables_to_json(tables_from_pages(extractor.tables)))
+
+def document_sources(documents):
+    """Labels each (name, pdf_bytes) document with its name, numbering repeats so no two documents share a label."""
+    seen = Counter()
+    sources = []
+    for name, _ in documents:
+        seen[name] += 1
+        sources.append(name if seen[name] == 1 else f"{name} ({seen[name]})")
+    return sources
+
+def stream_document_sentences(documents, processor, text_cache, timer, config, document_hashes, page_counts):
+    """Streams sentence records for (name, pdf_bytes) documents, reusing cached pages and sentences.
+
+    The PDFs are read straight from memory; nothing is written to disk. Each record's source is the
+    document's label from document_sources, which document_hashes maps to its content hash and
+    page_counts to its number of pages, including documents served from the cache.
+    """
+    for name, (_, pdf_bytes) in zip(document_sources(documents), documents):
+        logging.info(f"Processing file: {name}")
+        document_hashes[name] = make_document_hash(pdf_bytes)
+        cache_key = text_cache.document_key(pdf_bytes)
+
+        # A repeat upload of a known document skips extraction and NLP entirely.
+        # Sentence boundaries depend on the segmentation mode, so each mode has its own entry
+        sentences_kind = f"sentences-{processor.segmentation_mode}"
+        with timer.stage('extraction'):
+            cached_sentences = text_cache.get(cache_key, sentences_kind)
+            record_cache('text', cached_sentences is not None)
+        if cached_sentences is not None:
+            records = json.loads(cached_sentences)
+            page_count = text_cache.get(cache_key, 'page_count')
+            # The count is a cache entry of its own; if it was evicted the last page with text is the best estimate
+            page_counts[name] = int(page_count) if page_count else max((page for _, page in records), default=0)
+            for text, page in records:
+                yield {'text': text, 'source': name, 'page': page}
+            continue
+
+        with timer.stage('extraction'):
+            pages = text_cache.get_pages(cache_key)
+            if pages is not None:
+                page_counts[name] = len(pages)
+                text_cache.set(cache_key, 'page_count', str(len(pages)))
+        if pages is None:
+            # Tables are collected in the same pass over the pages, so table facts never parse the PDF again
+            extractor = PDFExtractor(pdf_bytes, num_workers=config.get_pdf_extraction_workers(),
+                                     collect_tables=config.get_table_facts_enabled())
+            pages = record_items(extractor.iter_pages(), partial(cache_extraction, text_cache, cache_key, extractor, page_counts, name))
+
+        normalized_pages = timer.wrap(processor.iter_normalized_pages(timer.wrap(pages, 'extraction')), 'preprocessing')
+        sentences = record_items(
+            timer.wrap(processor.iter_page_sentence_records(normalized_pages, name), 'segmentation'),
+            lambda items: text_cache.set(cache_key, sentences_kind, json.dumps([[item['text'], item['page']] for item in items]))
+        )
+        yield from sentences
+
+def iter_unindexed_chunks(chunks, document_hashes, collection, stored_embeddings, batch_size=16):
+    """Assigns each chunk its content-hash id and yields only chunks whose embedding is not stored yet.
+
+    Ids are looked up batch_size chunks at a time, with one collection read per batch.
+    """
+    chunks = iter(chunks)
+    while batch := list(islice(chunks, batch_size)):
+        for chunk in batch:
+            chunk['id'] = make_chunk_id(document_hashes[chunk['source']], chunk['text'])
+        # Repeated chunks share an id, and the collection rejects duplicate ids in one read
+        stored = get_stored_embeddings(collection, list(dict.fromkeys(chunk['id'] for chunk in batch)))
+        stored_embeddings.update(stored)
+        for chunk in batch:
+            record_cache('vector_store', chunk['id'] in stored)
+            if chunk['id'] not in stored:
+                yield chunk
+
+def extract_table_facts(documents, text_cache, config):
+    """Builds compact numeric facts from the tables of every document, caching the typed tables per document.
+
+    Tables collected while the text was extracted come from the cache; a document whose text was
+    already cached before is parsed for its tables on the extraction worker pool.
+    """
+    facts = []
+    for name, pdf_bytes in documents:
+        cache_key = text_cache.document_key(pdf_bytes)
+        cached_tables = text_cache.get(cache_key, 'tables')
+        if cached_tables is not None:
+            tables = tables_from_json(cached_tables)
+        else:
+            tables = TableExtractor(pdf_bytes, num_workers=config.get_pdf_extraction_workers()).extract_tables()
+            text_cache.set(cache_key, 'tables', tables_to_json(tables))
+        document_facts = build_facts(tables, source=name, max_lines=config.get_table_facts_max_lines())
+        if document_facts:
+            facts.append(document_facts)
+    return "\n".join(facts)
+
+def summarize_clusters(chunks, chunk_embeddings, response_cache, bypass_cache, timer, config, notices, facts=None,
+                       saved_clusters=None, backend=None):
+    """Clusters the chunks and summarizes each cluster.
+
+    Returns the combined text for the 2-page summary and the clusters (chunk ids and summary of
+    each) to save for the next run. Given saved_clusters from an earlier run, new chunks join the
+    nearest saved cluster instead and only clusters whose chunks changed are summarized again,
+    unless too few of the chunks were in a saved cluster for the clusters to be reused.
+    """
+    update = None
+    if saved_clusters:
+        with timer.stage('clustering'):
+            update = update_clusters(saved_clusters, [chunk['id'] for chunk in chunks], chunk_embeddings,
+                                     min_kept_share=config.get_cluster_reuse_min_share())
+    if update is not None:
+        cluster_groups, changed = update
+        # A cluster whose summary failed last time is retried
+        changed |= {index for index, cluster in enumerate(saved_clusters) if cluster['summary'] is None}
+        previous_summaries = [cluster['summary'] for cluster in saved_clusters]
+    else:
+        with timer.stage('clustering'):
+            _, cluster_groups = cluster_embeddings(
+                chunk_embeddings,
+                num_clusters=config.get_num_clusters(),
+                min_clusters=config.get_min_clusters(),
+                max_clusters=config.get_max_clusters()
+            )
+        changed = set(range(len(cluster_groups)))
+        previous_summaries = [None] * len(cluster_groups)
+
+    to_summarize = [cluster_id for cluster_id, indices in enumerate(cluster_groups) if len(indices) > 0 and cluster_id in changed]
+    groups = [
+        ([chunks[i]['text'] for i in cluster_groups[cluster_id]], f"Summarize the financial reports for cluster {cluster_id + 1}:")
+        for cluster_id in to_summarize
+    ]
+    budget = config.get_summary_input_max_tokens()
+    reduce_options = dict(
+        max_rounds=config.get_summary_reduce_max_rounds(),
+        max_concurrency=config.get_summary_max_concurrency(),
+        max_retries=config.get_summary_max_retries(),
+        cache=response_cache,
+        bypass_cache=bypass_cache,
+        backend=backend
+    )
+
+    with timer.stage('summarization'):
+        # Cluster summaries run concurrently and oversized clusters are reduced in bounded sub-batches;
+        # a failed cluster does not fail the run
+        results = reduce_groups(groups, budget, **reduce_options)
+        timer.count('summarization', len(groups))
+    summaries = dict(zip(to_summarize, results))
+    failed = [cluster_id for cluster_id in to_summarize if summaries[cluster_id] is None]
+    if update is not None:
+        logging.info(f"Reused {sum(1 for indices in cluster_groups if indices) - len(to_summarize)} cluster summaries; "
+                     f"summarized {len(to_summarize)} changed clusters")
+
+    clusters = []
+    cluster_summaries = []
+    for cluster_id, indices in enumerate(cluster_groups):
+        if len(indices) == 0:
+            continue
+        saved_summary = summaries[cluster_id] if cluster_id in summaries else previous_summaries[cluster_id]
+        # A failed cluster is saved without a summary so the next run retries it, but keeps its previous one for now
+        summary = saved_summary or previous_summaries[cluster_id]
+        clusters.append({'chunk_ids': list(dict.fromkeys(chunks[i]['id'] for i in indices)), 'summary': saved_summary})
+        if summary is not None:
+            cluster_summaries.append(summary)
+    if not cluster_summaries:
+        raise RuntimeError("Failed to generate a summary for any cluster.")
+    if failed:
+        notices.append(('warning', f"{len(failed)} of {len(clusters)} cluster summaries failed; continuing with a partial result."))
+
+    # The 2-page request carries its prompt, the combined summaries and the table facts within one budget;
+    # the facts get at most half of the room left by the prompt and the summaries the rest
+    available = text_budget(budget, template_2_page)
+    facts_text = ""
+    if facts:
+        header = "\n\nKey figures from the reports' tables:\n"
+        facts = trim_to_budget(facts, available // 2 - count_tokens(header, SUMMARY_MODEL), SUMMARY_MODEL)
+        facts_text = f"{header}{facts}" if facts else ""
+    with timer.stage('summarization'):
+        combined_cluster_summaries = fit_to_budget(
+            cluster_summaries, available - count_tokens(facts_text, SUMMARY_MODEL), request_budget=budget, **reduce_options
+        )
+    combined_cluster_summaries += facts_text
+    return combined_cluster_summaries, clusters
+
+class PipelineResources:
+    """Long-lived objects a run needs: the spaCy pipeline, caches, Chroma collection and LLM backend.
+
+    Each is created on first use from config and can be shared by consecutive and concurrent runs,
+    so only the first run pays for loading the spaCy model or opening the stores.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or get_config()
+        self._instances = {}
+        # Reentrant: the collection's factory gets the Chroma client through _get while holding the lock
+        self._lock = threading.RLock()
+
+    def _get(self, name, factory):
+        with self._lock:
+            if name not in self._instances:
+                self._instances[name] = factory()
+            return self._instances[name]
+
+    @property
+    def processor(self):
+        return self._get('processor', lambda: TextProcessor(
+            segmentation_mode=self.config.get_segmentation_mode(),
+            n_process=self.config.get_segmentation_processes(),
+            batch_size=self.config.get_segmentation_batch_size()
+        ))
+
+    @property
+    def text_cache(self):
+        return self._get('text_cache', lambda: TextCache(self.config.get_text_cache_directory(), self.config.get_text_cache_max_bytes()))
+
+    @property
+    def chroma_client(self):
+        return self._get('chroma_client', lambda: create_client(self.config.get_chromadb_directory()))
+
+    @property
+    def collection(self):
+        return self._get('collection', lambda: get_or_create_collection(COLLECTION_NAME, client=self.chroma_client))
+
+    @property
+    def backend(self):
+        return self._get('backend', lambda: backend_from_config(self.config))
+
+    @property
+    def embedding_cache(self):
+        return self._get('embedding_cache', lambda: EmbeddingCache(self.config.get_embedding_cache_path(), self.config.get_embedding_cache_max_entries()))
+
+    @property
+    def response_cache(self):
+        return self._get('response_cache', lambda: ResponseCache(
+            self.config.get_response_cache_path(),
+            max_memory_entries=self.config.get_response_cache_memory_entries(),
+            max_disk_entries=self.config.get_response_cache_disk_entries(),
+            ttl_seconds=self.config.get_response_cache_ttl_seconds()
+        ))
+
+# Steps reported to on_progress, in the order they run
+PROGRESS_STAGES = ('ingest', 'tables', 'summarization', 'summary_2_page', 'summary_1_page', 'docx')
+# Chunks between two ingest progress updates
+PROGRESS_CHUNK_INTERVAL = 25
+
+def _join_stream(stage, pieces):
+    return "".join(pieces)
+
+def _report_chunks(chunks, on_progress):
+    for count, chunk in enumerate(chunks, start=1):
+        if count % PROGRESS_CHUNK_INTERVAL == 0:
+            on_progress('ingest', f"Extracted and chunked {count} passages")
+        yield chunk
+
+def run_pipeline(documents, output_dir='output', bypass_cache=False, config=None, metrics=None, resources=None,
+                 on_progress=None, write_summary=None, state_path=None):
+    """Runs extraction through DOCX export for (name, pdf_bytes) documents without any UI.
+
+    Writes summary2page.docx and summary1page.docx into output_dir and returns a PipelineResult.
+    resources may be shared between runs. on_progress(stage, message) is called as each of
+    PROGRESS_STAGES starts. The 2-page and 1-page summaries are produced as streams of text
+    pieces and passed to write_summary(stage, pieces), which must return the full text; by
+    default the pieces are simply joined. The run's metrics are added to the process-wide
+    registry and, when METRICS_REPORT_DIRECTORY is set, written there as a JSON report.
+    With state_path, the clusters and their summaries are saved there in cluster mode, and a
+    later run over the same documents plus new ones only summarizes the clusters that changed.
+    Raises ValueError if the documents yield no text chunks.
+    """
+    resources = resources or PipelineResources(config)
+    config = config or resources.config
+    metrics = metrics or RunMetrics()
+    on_progress = on_progress or (lambda stage, message: None)
+    write_summary = write_summary or _join_stream
+    try:
+        with metrics.activate():
+            return _run_pipeline(documents, output_dir, bypass_cache, config, metrics, resources, on_progress, write_summary,
+                                 state_path)
+    finally:
+        # Failed runs are reported too, so the stage that failed shows up with its timings
+        metrics.finish()
+        if config.get_metrics_report_directory():
+            metrics.write_report(config.get_metrics_report_directory())
+
+def _run_pipeline(documents, output_dir, bypass_cache, config, timer, resources, on_progress, write_summary, state_path):
+    notices = []
+    os.makedirs(output_dir, exist_ok=True)
+    on_progress('ingest', f"Reading {len(documents)} documents")
+
+    processor = resources.processor
+    text_cache = resources.text_cache
+    collection = resources.collection
+    backend = resources.backend
+
+    # Pages are extracted lazily and flow through every text stage, so each chunk
+    # is embedded while later pages are still being parsed
+    document_hashes = {}
+    page_counts = {}
+    sentences = stream_document_sentences(documents, processor, text_cache, timer, config, document_hashes, page_counts)
+    chunks = []
+    token_chunks = timer.wrap(processor.iter_token_chunks(
+        sentences,
+        max_tokens=min(config.get_chunk_max_tokens(), EMBEDDING_MAX_INPUT_TOKENS),
+        overlap_tokens=config.get_chunk_overlap_tokens()
+    ), 'chunking')
+    token_chunks = _report_chunks(token_chunks, on_progress)
+    # Boilerplate shared between uploaded reports is embedded and summarized only once
+    dedup_filter = None
+    if config.get_dedup_enabled():
+        dedup_filter = NearDuplicateFilter(threshold=config.get_dedup_threshold())
+        token_chunks = timer.wrap(dedup_filter.filter(token_chunks), 'dedup')
+    # Ranking needs every chunk, so with the prefilter enabled embedding starts once chunking is done
+    dropped_irrelevant = 0
+    if config.get_relevance_keep_ratio() < 1:
+        with timer.stage('relevance'):
+            kept_chunks, dropped_irrelevant = filter_relevant_chunks(token_chunks, template_2_page, config.get_relevance_keep_ratio())
+        token_chunks = iter(kept_chunks)
+    # Chunks already in the collection reuse their stored vectors; only new ones are embedded
+    stored_embeddings = {}
+    new_chunks = []
+    new_chunk_stream = record_items(
+        timer.wrap(iter_unindexed_chunks(record_items(token_chunks, chunks.extend), document_hashes, collection, stored_embeddings,
+                                         batch_size=config.get_embedding_batch_size()), 'indexing'),
+        new_chunks.extend
+    )
+    embedding_cache = resources.embedding_cache
+    rate_limiter = RateLimiter(config.get_embedding_requests_per_minute(), config.get_embedding_tokens_per_minute())
+    with timer.stage('embedding'):
+        new_embeddings = generate_embeddings_batch(
+            (chunk['text'] for chunk in new_chunk_stream),
+            max_workers=config.get_embedding_max_workers(),
+            max_batch_size=config.get_embedding_batch_size(),
+            rate_limiter=rate_limiter,
+            cache=embedding_cache,
+            backend=backend
+        )
+    timer.count('embedding', len(new_embeddings))
+
+    if not chunks:
+        raise ValueError("No valid text chunks generated from the provided PDFs.")
+
+    metadatas = [
+        {
+            'text': chunk['text'],
+            'source': chunk['source'],
+            'document_hash': document_hashes[chunk['source']],
+            'page_start': chunk['page_start'],
+            'page_end': chunk['page_end']
+        }
+        for chunk in new_chunks
+    ]
+    with timer.stage('indexing'):
+        upsert_embeddings(collection, [chunk['id'] for chunk in new_chunks], new_embeddings, metadatas)
+    logging.info(f"Indexed {len(new_chunks)} new chunks; reused {len(chunks) - len(new_chunks)} stored chunks")
+    if dedup_filter and dedup_filter.removed:
+        notices.append(('info', f"Removed {dedup_filter.removed} near-duplicate chunks across the uploaded reports."))
+    if dropped_irrelevant:
+        notices.append(('info', f"Skipped {dropped_irrelevant} low-relevance chunks (exhibits, signatures, certifications and similar)."))
+    stored_embeddings.update(zip([chunk['id'] for chunk in new_chunks], new_embeddings))
+    chunk_embeddings = [stored_embeddings[chunk['id']] for chunk in chunks]
+
+    response_cache = resources.response_cache
+
+    facts = None
+    if config.get_table_facts_enabled():
+        on_progress('tables', "Extracting figures from tables")
+        with timer.stage('tables'):
+            facts = extract_table_facts(documents, text_cache, config)
+
+    on_progress('summarization', f"Summarizing {len(chunks)} chunks")
+    if config.get_summarization_mode() == 'retrieval':
+        with timer.stage('summarization'):
+            summary_2_page_text, failed_sections = summarize_by_section(
+                collection,
+                set(document_hashes.values()),
+                template_2_page,
+                top_k=config.get_retrieval_top_k(),
+                embedding_cache=embedding_cache,
+                response_cache=response_cache,
+                bypass_cache=bypass_cache,
+                max_concurrency=config.get_summary_max_concurrency(),
+                max_retries=config.get_summary_max_retries(),
+                facts=facts,
+                backend=backend
+            )
+        if failed_sections:
+            notices.append(('warning', f"Could not summarize these sections: {', '.join(failed_sections)}."))
+        summary_2_page_pieces = iter([summary_2_page_text])
+    else:
+        settings = state_settings(config)
+        # Regenerating ignores the saved cluster summaries just like the cached responses
+        saved_clusters = load_state(state_path, settings) if state_path and not bypass_cache else None
+        combined_cluster_summaries, clusters = summarize_clusters(
+            chunks, chunk_embeddings, response_cache, bypass_cache, timer, config, notices, facts=facts,
+            saved_clusters=saved_clusters, backend=backend
+        )
+        if state_path:
+            save_state(state_path, settings, clusters)
+        summary_2_page_pieces = generate_summary_stream(combined_cluster_summaries, template_2_page, cache=response_cache,
+                                                        bypass_cache=bypass_cache, backend=backend)
+
+    on_progress('summary_2_page', "Writing the 2-page summary")
+    with timer.stage('summarization'):
+        summary_2_page = write_summary('summary_2_page', summary_2_page_pieces)
+    on_progress('summary_1_page', "Writing the 1-page summary")
+    with timer.stage('summarization'):
+        summary_1_page = write_summary('summary_1_page', generate_summary_stream(
+            summary_2_page, template_1_page, cache=response_cache, bypass_cache=bypass_cache, backend=backend
+        ))
+    timer.count('summarization', 2)
+
+    on_progress('docx', "Saving the summaries")
+    output_paths = [os.path.join(output_dir, 'summary2page.docx'), os.path.join(output_dir, 'summary1page.docx')]
+    with timer.stage('docx'):
+        docx_utils.save_to_docx(summary_2_page, output_paths[0], '2-Page Summary')
+        docx_utils.save_to_docx(summary_1_page, output_paths[1], '1-Page Summary')
+    timer.count('docx', len(output_paths))
+
+    return PipelineResult(
+        summary_2_page, summary_1_page, output_paths,
+        num_pages=sum(page_counts.values()),
+        num_chunks=len(chunks),
+        num_new_chunks=len(new_chunks),
+        notices=notices,
+        metrics=timer
+    )
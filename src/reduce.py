@@ -0,0 +1,126 @@
+import logging
+from collections import Counter
+from src.openai_utils import SUMMARY_MODEL, SUMMARY_SYSTEM_PROMPT, generate_summaries
+from src.token_utils import count_tokens, split_by_tokens
+
+# Used to combine partial summaries of one input once it needed more than one request
+MERGE_TEMPLATE = "Combine these partial summaries of the financial reports into one summary, keeping every figure:"
+
+def text_budget(budget, template, model=SUMMARY_MODEL):
+    """Tokens left for the text of a request of at most budget tokens once its system prompt and template are counted."""
+    available = budget - count_tokens(SUMMARY_SYSTEM_PROMPT, model) - count_tokens(template, model)
+    if available < 1:
+        raise ValueError(f"A budget of {budget} tokens leaves no room for text after the prompt and template.")
+    return available
+
+def trim_to_budget(text, budget, model=SUMMARY_MODEL):
+    """Keeps the leading whole lines of text that fit in budget tokens."""
+    if count_tokens(text, model) <= budget:
+        return text
+    kept, used = [], 0
+    for line in text.split("\n"):
+        tokens = count_tokens(line + "\n", model)
+        if used + tokens > budget:
+            break
+        kept.append(line)
+        used += tokens
+    logging.info(f"Trimmed text from {count_tokens(text, model)} to at most {budget} tokens")
+    return "\n".join(kept)
+
+def pack_by_tokens(texts, budget, separator=" ", model=SUMMARY_MODEL):
+    """Packs consecutive texts into as few batches of at most budget tokens as possible.
+
+    Texts longer than the budget on their own are split first. Returns the joined batches.
+    """
+    separator_tokens = count_tokens(separator, model) if separator else 0
+    batches = []
+    current, current_tokens = [], 0
+    for text in texts:
+        tokens = count_tokens(text, model)
+        pieces = [(text, tokens)] if tokens <= budget else [
+            (piece, count_tokens(piece, model)) for piece in split_by_tokens(text, budget - 1, model)
+        ]
+        for piece, piece_tokens in pieces:
+            if current and current_tokens + separator_tokens + piece_tokens > budget:
+                batches.append(separator.join(current))
+                current, current_tokens = [], 0
+            current_tokens += piece_tokens + (separator_tokens if current else 0)
+            current.append(piece)
+    if current:
+        batches.append(separator.join(current))
+    return batches
+
+def reduce_groups(groups, budget, separator=" ", max_rounds=3, max_concurrency=5, max_retries=3, cache=None,
+                  bypass_cache=False, backend=None, model=SUMMARY_MODEL):
+    """Summarizes each (texts, template) group into a single summary with requests of at most budget tokens.
+
+    A group that fits the budget takes one request, exactly as if its texts were joined and summarized
+    directly. Larger groups are split into bounded sub-batches whose summaries are merged again,
+    round by round, until one summary is left. Each round sends the requests of every group at
+    once, so the groups are reduced in parallel. After max_rounds the remaining partial summaries
+    are joined as they are. The budget covers the system prompt and template as well as the text.
+    Returns summaries in group order, None for a group whose every request failed.
+    """
+    results = [None] * len(groups)
+    pending = {index: (list(texts), template, separator) for index, (texts, template) in enumerate(groups) if texts}
+    for round_number in range(1, max_rounds + 1):
+        if not pending:
+            break
+        requests, owners = [], []
+        for index, (texts, template, joiner) in pending.items():
+            template = template if round_number == 1 else MERGE_TEMPLATE
+            batches = pack_by_tokens(texts, text_budget(budget, template, model), separator=joiner, model=model)
+            requests.extend((batch, template) for batch in batches)
+            owners.extend([index] * len(batches))
+        logging.info(f"Reduce round {round_number}: {len(requests)} requests for {len(pending)} inputs")
+        summaries = generate_summaries(requests, max_concurrency=max_concurrency, max_retries=max_retries,
+                                       cache=cache, bypass_cache=bypass_cache, backend=backend)
+
+        requested = Counter(owners)
+        partials = {index: [] for index in pending}
+        for index, summary in zip(owners, summaries):
+            if summary is not None:
+                partials[index].append(summary)
+        for index, texts in partials.items():
+            if len(texts) < requested[index]:
+                logging.error(f"{requested[index] - len(texts)} of {requested[index]} partial summaries failed for input {index + 1}")
+            if not texts:
+                del pending[index]
+            elif requested[index] == 1:
+                results[index] = texts[0]
+                del pending[index]
+            else:
+                pending[index] = (texts, pending[index][1], "\n\n")
+    for index, (texts, _, joiner) in pending.items():
+        logging.info(f"Input {index + 1} still has {len(texts)} partial summaries after {max_rounds} rounds; joining them")
+        results[index] = joiner.join(texts)
+    return results
+
+def fit_to_budget(texts, budget, separator="\n", request_budget=None, max_rounds=3, max_concurrency=5, max_retries=3,
+                  cache=None, bypass_cache=False, backend=None, model=SUMMARY_MODEL):
+    """Joins texts, first merging them in bounded sub-batches for as long as the result exceeds budget tokens.
+
+    Text that already fits is returned unchanged without any request. Each merge request is at most
+    request_budget tokens including its prompt (budget if not given). If the merged summaries still
+    do not fit after max_rounds, the result is truncated to the budget.
+    """
+    for round_number in range(1, max_rounds + 1):
+        combined = separator.join(texts)
+        if count_tokens(combined, model) <= budget:
+            return combined
+        batches = pack_by_tokens(texts, text_budget(request_budget or budget, MERGE_TEMPLATE, model), separator=separator, model=model)
+        logging.info(f"Merge round {round_number}: {count_tokens(combined, model)} tokens exceed the budget of {budget}; "
+                     f"merging {len(texts)} texts in {len(batches)} requests")
+        summaries = generate_summaries([(batch, MERGE_TEMPLATE) for batch in batches], max_concurrency=max_concurrency,
+                                       max_retries=max_retries, cache=cache, bypass_cache=bypass_cache, backend=backend)
+        merged = [summary for summary in summaries if summary is not None]
+        if not merged:
+            raise RuntimeError("Failed to merge any partial summary.")
+        if len(merged) < len(summaries):
+            logging.error(f"{len(summaries) - len(merged)} of {len(summaries)} merge requests failed")
+        texts = merged
+    combined = separator.join(texts)
+    if count_tokens(combined, model) <= budget:
+        return combined
+    logging.info(f"Merged text still exceeds {budget} tokens after {max_rounds} rounds; truncating it")
+    return split_by_tokens(combined, budget - 1, model)[0]
@@ -0,0 +1,53 @@
+import logging
+import math
+import re
+from src.lazy import lazy_import
+from src.templates import get_template_sections
+
+sklearn_text = lazy_import('sklearn.feature_extraction.text')
+sklearn_pairwise = lazy_import('sklearn.metrics.pairwise')
+
+# Filing boilerplate that never informs the summary sections: exhibit indexes, signature pages,
+# officer certifications and tables of contents
+BOILERPLATE_PATTERNS = re.compile(
+    r'exhibit\s+index|exhibit\s+number|^\W*signatures?\b|pursuant\s+to\s+the\s+requirements\s+of\s+the\s+securities\s+exchange\s+act'
+    r'|certification\s+of\s+(?:the\s+)?(?:chief|principal)|section\s+906|rule\s+13a-14|sarbanes-oxley|table\s+of\s+contents|inline\s+xbrl',
+    re.IGNORECASE | re.MULTILINE
+)
+# Score multiplier for chunks that match the boilerplate patterns
+BOILERPLATE_PENALTY = 0.1
+
+def build_section_queries(template):
+    return [f"{title} {points}" for title, points in get_template_sections(template)]
+
+def score_chunks(texts, section_queries):
+    """Scores each text by its highest TF-IDF cosine similarity to any template section query."""
+    vectorizer = sklearn_text.TfidfVectorizer(stop_words='english', sublinear_tf=True, ngram_range=(1, 2), min_df=1)
+    matrix = vectorizer.fit_transform(list(texts) + list(section_queries))
+    chunk_vectors, query_vectors = matrix[:len(texts)], matrix[len(texts):]
+    scores = sklearn_pairwise.linear_kernel(chunk_vectors, query_vectors).max(axis=1)
+    return [
+        score * BOILERPLATE_PENALTY if BOILERPLATE_PATTERNS.search(text) else score
+        for text, score in zip(texts, scores)
+    ]
+
+def filter_relevant_chunks(chunks, template, keep_ratio=1.0, key=lambda chunk: chunk['text']):
+    """Keeps the keep_ratio most relevant chunks for the template's sections, in their original order.
+
+    Returns the kept chunks and the number dropped. Scoring is local; no API call is made.
+    """
+    try:
+        chunks = list(chunks)
+        if keep_ratio >= 1 or len(chunks) <= 1:
+            return chunks, 0
+        texts = [key(chunk) for chunk in chunks]
+        scores = score_chunks(texts, build_section_queries(template))
+        keep_count = max(1, math.ceil(len(chunks) * keep_ratio))
+        ranked = sorted(range(len(chunks)), key=lambda i: scores[i], reverse=True)
+        kept_indices = sorted(ranked[:keep_count])
+        dropped = len(chunks) - keep_count
+        logging.info(f"Relevance prefilter kept {keep_count} of {len(chunks)} chunks")
+        return [chunks[i] for i in kept_indices], dropped
+    except Exception as e:
+        logging.error(f"Failed to filter chunks by relevance: {str(e)}", exc_info=True)
+        raise RuntimeError(f"Failed to filter chunks by relevance: {str(e)}")
@@ -0,0 +1,101 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+class ResponseCache:
+    """Two-tier cache of LLM responses: an in-memory LRU in front of a SQLite store on disk.
+
+    Entries expire after ttl_seconds and each tier is bounded by its own entry count.
+    """
+
+    def __init__(self, db_path, max_memory_entries=256, max_disk_entries=10000, ttl_seconds=7 * 24 * 3600):
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model, system_prompt, template, text) -> str:
+        text_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        return hashlib.sha256(json.dumps([model, system_prompt, template, text_hash]).encode('utf-8')).hexdigest()
+
+    def _expired(self, created_at, now):
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                response, created_at = entry
+                if not self._expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    return response
+                del self._memory[key]
+            try:
+                row = self._conn.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                response, created_at = row
+                if self._expired(created_at, now):
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                    return None
+                self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+            except Exception as e:
+                logging.error(f"Failed to read response cache: {str(e)}", exc_info=True)
+                return None
+            self._remember(key, response, created_at)
+            return response
+
+    def set(self, key, response):
+        now = time.time()
+        with self._lock:
+            self._remember(key, response, now)
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, created_at, last_used) VALUES (?, ?, ?, ?)",
+                    (key, response, now, now)
+                )
+                self._evict_disk(now)
+                self._conn.commit()
+            except Exception as e:
+                logging.error(f"Failed to write response cache: {str(e)}", exc_info=True)
+
+    def _remember(self, key, response, created_at):
+        self._memory[key] = (response, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self, now):
+        if self.ttl_seconds is not None:
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        excess = count - self.max_disk_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used LIMIT ?)", (excess,)
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
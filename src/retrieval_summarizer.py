@@ -0,0 +1,55 @@
+import logging
+import re
+from src.chromadb_utils import query_embeddings
+from src.openai_utils import generate_embeddings_batch, generate_summaries
+from src.templates import get_template_sections, section_template
+
+# Sections that are mostly about figures receive the table facts alongside the retrieved text
+NUMERIC_SECTIONS = re.compile(r'segment|performance|sales|geograph|revenue', re.IGNORECASE)
+
+def retrieve_section_context(collection, query_embedding, document_hashes, top_k):
+    """Returns the texts of the top_k chunks closest to the query, restricted to the given documents."""
+    where = {'document_hash': {'$in': list(document_hashes)}} if len(document_hashes) > 1 else {'document_hash': list(document_hashes)[0]}
+    result = query_embeddings(collection, query_embedding, top_k=top_k, where=where)
+    return [metadata['text'] for metadata in result['metadatas'][0]]
+
+def summarize_by_section(collection, document_hashes, template, top_k=8, embedding_cache=None, response_cache=None,
+                         bypass_cache=False, max_concurrency=5, max_retries=3, facts=None, backend=None):
+    """Writes each section of template from only the chunks retrieved for that section.
+
+    Every section heading and its bullet points are embedded once as a query, the top_k most
+    relevant chunks of the uploaded documents are retrieved, and all sections are summarized
+    concurrently. Table facts, when given, are added to the context of the numeric sections.
+    Returns the combined summary and the titles of any sections that failed.
+    """
+    try:
+        sections = get_template_sections(template)
+        if not sections:
+            raise ValueError("Template has no sections to retrieve context for.")
+        logging.info(f"Summarizing {len(sections)} template sections from the top {top_k} chunks each")
+        queries = [f"{title}\n{points}" for title, points in sections]
+        query_embeddings_list = generate_embeddings_batch(queries, cache=embedding_cache, backend=backend)
+
+        requests = []
+        for (title, points), query_embedding in zip(sections, query_embeddings_list):
+            context = retrieve_section_context(collection, query_embedding, document_hashes, top_k)
+            if facts and NUMERIC_SECTIONS.search(title):
+                context.append(f"Key figures from the reports' tables:\n{facts}")
+            requests.append(("\n\n".join(context), section_template.format(title=title, points=points)))
+
+        section_summaries = generate_summaries(
+            requests,
+            max_concurrency=max_concurrency,
+            max_retries=max_retries,
+            cache=response_cache,
+            bypass_cache=bypass_cache,
+            backend=backend
+        )
+        failed_sections = [title for (title, _), summary in zip(sections, section_summaries) if summary is None]
+        if len(failed_sections) == len(sections):
+            raise RuntimeError("Failed to generate a summary for any template section.")
+        summary = "\n\n".join(summary for summary in section_summaries if summary is not None)
+        return summary, failed_sections
+    except Exception as e:
+        logging.error(f"Failed to summarize by section: {str(e)}", exc_info=True)
+        raise RuntimeError(f"Failed to summarize by section: {str(e)}")
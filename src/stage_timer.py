@@ -0,0 +1,51 @@
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+class StageTimer:
+    """Accumulates wall time and item counts per pipeline stage.
+
+    The pipeline's stages are nested generators, so a stage is charged only its exclusive time:
+    while a stage waits on the stage feeding it, the clock runs for the upstream stage instead.
+    Stages must be entered from a single thread.
+    """
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.items = defaultdict(int)
+        self._stack = []  # [stage, nested_seconds] for every stage currently running
+
+    @contextmanager
+    def stage(self, name):
+        self.seconds.setdefault(name, 0.0)
+        frame = [name, 0.0]
+        self._stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._stack.pop()
+            self.seconds[name] += elapsed - frame[1]
+            if self._stack:
+                self._stack[-1][1] += elapsed
+
+    def wrap(self, iterable, name):
+        """Yields the items of iterable, timing each step under name and counting the items."""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            self.items[name] += 1
+            yield item
+
+    def count(self, name, n=1):
+        self.items[name] += n
+
+    def report(self):
+        """Returns {stage: {'seconds', 'items'}} in the order the stages first ran."""
+        stages = list(dict.fromkeys(list(self.seconds) + list(self.items)))
+        return {name: {'seconds': self.seconds.get(name, 0.0), 'items': self.items.get(name, 0)} for name in stages}
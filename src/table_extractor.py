@@ -0,0 +1,213 @@
+import io
+import json
+import logging
+import re
+from src.lazy import lazy_import
+from src.pdf_extractor import PDFExtractor
+
+pd = lazy_import('pandas')
+
+_UNIT = re.compile(r'\(\s*(?:\$|dollars)?\s*in\s+(thousands|millions|billions)', re.IGNORECASE)
+_NUMBER = re.compile(r'^\(?-?\$?\(?([0-9](?:[0-9,]*[0-9])?(?:\.[0-9]+)?)\)?(%)?\)?$')
+# Spaces after "$", "(" or a minus sign and before ")" or "%" belong to the number they sit in; other spaces separate values
+_NUMBER_SPACE = re.compile(r'(?<=[$(])\s+|(?<=-)\s+(?=[$(0-9])|\s+(?=[)%])')
+_YEAR = re.compile(r'\b(?:19|20)\d{2}\b')
+_MISSING = {'', '-', '—', '–', 'n/a', 'nm', '*'}
+_GENERATED_COLUMN = re.compile(r'^column_\d+$')
+_FOOTNOTE = re.compile(r'^\(\d\)$')
+# Row labels worth passing to the summarizer: sales, margins and earnings, named as any issuer reports them
+FACT_LABELS = re.compile(
+    r'\b(?:net\s+sales|revenues?|gross\s+(?:margin|profit)|operating\s+(?:income|margin|expenses)|net\s+income'
+    r'|earnings\s+per\s+share|eps|diluted|ebitda)\b',
+    re.IGNORECASE
+)
+# Tables that break revenue down by segment, geography or product, whose every row is a fact. Their row
+# labels (Americas, Greater China, iPhone, Services) differ by issuer, so the table is known by its context
+BREAKDOWN_CONTEXT = re.compile(
+    r'\b(?:net\s+sales|revenues?)\s+(?:disaggregated\s+)?by\s+(?:\w+\s+){0,2}?'
+    r'(?:segments?|categor(?:y|ies)|products?|geograph(?:y|ic\s+area)|regions?)\b'
+    r'|\bsegment\s+information\b',
+    re.IGNORECASE
+)
+
+def _compact(text):
+    return _NUMBER_SPACE.sub('', str(text).strip().replace('−', '-'))
+
+def parse_number(cell):
+    """Parses a financial table cell such as "$ 1,234.5", "(12)" or "8 %" into a float, or None.
+
+    A cell holding more than one number, such as "2023 2022", is not a number and gives None.
+    """
+    if cell is None:
+        return None
+    text = _compact(cell)
+    if text.lower() in _MISSING:
+        return None
+    match = _NUMBER.match(text)
+    if not match:
+        return None
+    value = float(match.group(1).replace(',', ''))
+    if text.startswith(('(', '-', '$(', '$-')):
+        value = -value
+    return value
+
+def _is_value(token):
+    return parse_number(token) is not None or token.removesuffix('%').lower() in _MISSING
+
+def split_cell(cell):
+    """Splits a cell into its leading label and the values after it, one cell each.
+
+    pdfplumber often merges the columns of a row into one cell, as in "Americas $ 50,430 $ 49,278 2 %",
+    which becomes ["Americas", "$50,430", "$49,278", "2%"]. A cell holding one value and nothing
+    else, or whose label ends in a comma as dates do ("December 30, 2023"), is kept as it is.
+    """
+    tokens = _compact(cell).split()
+    start = len(tokens)
+    while start > 0 and _is_value(tokens[start - 1]):
+        start -= 1
+    # Footnote markers such as "(1)" right after the label belong to it when at least two values follow
+    while 0 < start < len(tokens) - 2 and _FOOTNOTE.match(tokens[start]):
+        start += 1
+    label, values = tokens[:start], tokens[start:]
+    if not values or (not label and len(values) == 1) or (label and label[-1].endswith(',')):
+        return [cell]
+    return ([' '.join(label)] if label else []) + values
+
+def _is_header(row):
+    # A header names its columns; years are the only numbers it holds
+    return not any(parse_number(cell) is not None and not _YEAR.fullmatch(cell) for cell in row[1:])
+
+def table_to_frame(rows):
+    """Builds a typed DataFrame from raw pdfplumber rows, or returns None if the table has no numbers.
+
+    Cells that merge a label with its values are split first. The first row with text becomes the
+    header unless it holds figures, in which case the columns are named column_1, column_2 and so on.
+    The first column is kept as the row label and every other column that is mostly numeric is
+    converted to floats. Columns holding only percentages get a " %" suffix on their name so the unit
+    survives the conversion.
+    """
+    rows = [
+        [part for cell in row for part in split_cell((cell or '').replace('\n', ' ').strip())]
+        for row in rows if row and any(row)
+    ]
+    if len(rows) < 2:
+        return None
+    width = max(len(row) for row in rows)
+    header, body = (rows[0], rows[1:]) if _is_header(rows[0]) else ([], rows)
+    header = header + [''] * (width - len(header))
+    columns = [name or f"column_{i}" for i, name in enumerate(header)]
+    # Duplicate header names would make column access ambiguous
+    columns = [name if columns.count(name) == 1 else f"{name}_{i}" for i, name in enumerate(columns)]
+    frame = pd.DataFrame([row + [''] * (width - len(row)) for row in body], columns=columns)
+    numeric_columns = []
+    renamed = {frame.columns[0]: 'label'}
+    for column in frame.columns[1:]:
+        parsed = frame[column].map(parse_number)
+        if parsed.notna().sum() >= max(1, len(frame) // 2):
+            if frame[column][parsed.notna()].str.contains('%', regex=False).all():
+                renamed[column] = f"{column} %"
+            frame[column] = parsed.astype('float64')
+            numeric_columns.append(column)
+    if not numeric_columns:
+        return None
+    frame = frame[[frame.columns[0]] + numeric_columns].rename(columns=renamed)
+    return frame[frame['label'] != ''].reset_index(drop=True)
+
+def tables_from_pages(pages):
+    """Types the raw tables of (page_number, page_text, raw_tables) pages as (page_number, unit, DataFrame, context).
+
+    pages is what PDFExtractor collects with collect_tables; the unit is read from the page text.
+    context is the phrase, such as "Net sales by reportable segment", that marks a revenue breakdown
+    table, found in the table itself or else in its page text, and None for any other table.
+    """
+    tables = []
+    for page_number, page_text, raw_tables in pages:
+        unit_match = _UNIT.search(page_text or '')
+        unit = unit_match.group(1).lower() if unit_match else None
+        page_context = BREAKDOWN_CONTEXT.search(page_text or '')
+        for rows in raw_tables:
+            frame = table_to_frame(rows)
+            if frame is None:
+                continue
+            context = BREAKDOWN_CONTEXT.search(' '.join(cell or '' for row in rows for cell in row)) or page_context
+            tables.append((page_number, unit, frame, ' '.join(context.group(0).split()) if context else None))
+    return tables
+
+class TableExtractor:
+    def __init__(self, source, num_workers=1):
+        # source may be a file path, the PDF's bytes or a binary file-like object
+        self.source = source
+        self.num_workers = num_workers
+
+    def extract_tables(self):
+        """Extracts every numeric table in the PDF as (page_number, unit, DataFrame, context)."""
+        logging.info("Extracting tables from PDF")
+        try:
+            extractor = PDFExtractor(self.source, num_workers=self.num_workers, collect_tables=True)
+            for _ in extractor.iter_pages():
+                pass
+            tables = tables_from_pages(extractor.tables)
+            logging.info(f"Extracted {len(tables)} numeric tables")
+            return tables
+        except Exception as e:
+            logging.error(f"Failed to extract tables from PDF: {str(e)}", exc_info=True)
+            raise RuntimeError(f"Failed to extract tables from PDF: {str(e)}")
+
+def tables_to_json(tables):
+    return json.dumps([
+        {'page': page_number, 'unit': unit, 'frame': frame.to_json(orient='split', index=False), 'context': context}
+        for page_number, unit, frame, context in tables
+    ])
+
+def tables_from_json(data):
+    return [
+        (item['page'], item['unit'], pd.read_json(io.StringIO(item['frame']), orient='split'), item['context'])
+        for item in json.loads(data)
+    ]
+
+def _format_value(value):
+    return f"{value:,.0f}" if abs(value) >= 100 else f"{value:,.2f}".rstrip('0').rstrip('.')
+
+def build_facts(tables, source=None, max_lines=200):
+    """Renders the key rows of the tables as compact one-line facts.
+
+    Each line reads "source p.N (unit) | label: column=value; column=value; YoY=+x.x%", where the
+    year-over-year change compares the first two columns whose headers are years. Values of columns
+    without a header are listed without a name. Every row of a revenue breakdown table is kept, after
+    its context; other tables keep the rows whose label names a sales, margin or earnings figure.
+    A row label is prefixed with the heading row above it, such as "Europe:", if there is one.
+    """
+    lines = []
+    for page_number, unit, frame, context in tables:
+        value_columns = list(frame.columns[1:])
+        year_columns = [column for column in value_columns if _YEAR.search(str(column))][:2]
+        heading = None
+        for _, row in frame.iterrows():
+            label = str(row['label'])
+            values = [(column, row[column]) for column in value_columns if pd.notna(row[column])]
+            if not values:
+                if label.endswith(':'):
+                    heading = label.rstrip(':').strip()
+                continue
+            if heading:
+                label = f"{heading} - {label}"
+            if not context and not FACT_LABELS.search(label):
+                continue
+            parts = []
+            for column, value in values:
+                name = str(column).removesuffix(' %')
+                text = f"{_format_value(value)}%" if str(column).endswith(' %') else _format_value(value)
+                # Columns without a header are listed by value alone
+                parts.append(text if _GENERATED_COLUMN.match(name) else f"{name}={text}")
+            if len(year_columns) == 2 and pd.notna(row[year_columns[0]]) and pd.notna(row[year_columns[1]]) and row[year_columns[1]]:
+                current, previous = row[year_columns[0]], row[year_columns[1]]
+                parts.append(f"YoY={(current - previous) / abs(previous) * 100:+.1f}%")
+            prefix = f"{source} p.{page_number}" if source else f"p.{page_number}"
+            if unit:
+                prefix += f" ({unit})"
+            if context:
+                prefix += f" | {context}"
+            lines.append(f"{prefix} | {label}: {'; '.join(parts)}")
+            if len(lines) >= max_lines:
+                return "\n".join(lines)
+    return "\n".join(lines)
@@ -86,3 +86,22 @@ Please summarize the following 2-page financial report summary into a concise 1-
 
 Ensure the summary is concise, accurate, and covers all the specified sections. Use bullet points for clarity and limit the summary to 1 page.
 """
+
+section_template = """
+Using only the report excerpts below, write the "{title}" section of a financial summary for financial advisors.
+Start with the heading "#### {title}" and cover these points:
+{points}
+
+Use bullet points for clarity. If the excerpts do not contain the information for a point, say that it is not disclosed.
+"""
+
+def get_template_sections(template):
+    """Returns (title, points) for each "#### Title" section of a template, where points are its "- " bullet lines."""
+    sections = []
+    for line in template.splitlines():
+        line = line.strip()
+        if line.startswith("#### "):
+            sections.append((line[5:].strip(), []))
+        elif line.startswith("- ") and sections:
+            sections[-1][1].append(line)
+    return [(title, "\n".join(points)) for title, points in sections]
@@ -0,0 +1,76 @@
+import hashlib
+import logging
+import os
+
+# Bump whenever extraction or text processing changes so stale cache entries are never reused
+PIPELINE_VERSION = "5"
+
+# Separates pages in cached extraction output so they can be streamed back page by page
+PAGE_SEPARATOR = "\f"
+
+class TextCache:
+    """On-disk cache of extracted and sentence-segmented PDF text keyed by document content."""
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def document_key(pdf_bytes) -> str:
+        return f"{hashlib.sha256(pdf_bytes).hexdigest()}-v{PIPELINE_VERSION}"
+
+    def _path(self, key, kind):
+        return os.path.join(self.cache_dir, f"{key}.{kind}.txt")
+
+    def get(self, key, kind):
+        path = self._path(key, kind)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                text = f.read()
+            # Refresh the modification time so eviction treats this entry as recently used
+            os.utime(path, None)
+            logging.info(f"Text cache hit: {key} ({kind})")
+            return text
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.error(f"Failed to read text cache entry: {str(e)}", exc_info=True)
+            return None
+
+    def set(self, key, kind, text):
+        path = self._path(key, kind)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+            self._evict()
+        except Exception as e:
+            logging.error(f"Failed to write text cache entry: {str(e)}", exc_info=True)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def get_pages(self, key):
+        text = self.get(key, 'extracted')
+        return None if text is None else text.split(PAGE_SEPARATOR)
+
+    def set_pages(self, key, pages):
+        self.set(key, 'extracted', PAGE_SEPARATOR.join(pages))
+
+    def _evict(self):
+        entries = []
+        total_bytes = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.txt'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total_bytes += stat.st_size
+        entries.sort()
+        while total_bytes > self.max_bytes and entries:
+            _, size, path = entries.pop(0)
+            os.remove(path)
+            total_bytes -= size
+            logging.info(f"Evicted text cache entry: {os.path.basename(path)}")
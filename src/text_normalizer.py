@@ -0,0 +1,30 @@
+import re
+
+# Horizontal whitespace only, so line structure survives until headings have been detected
+_HORIZONTAL_WHITESPACE = re.compile(r'[^\S\n]+')
+_LINE_BREAKS = re.compile(r'\r\n?|[\n\f\v\u2028\u2029]')
+# A heading is an all-caps line with at least one word of two or more letters, e.g. "RISK FACTORS"
+_HEADING = re.compile(r'^(?=.*[A-Z]{2})[A-Z][A-Z\s&,\'\-]*$')
+# A label is a short title ending in a colon, e.g. "Net sales by category:"
+_LABEL = re.compile(r'^[A-Za-z][A-Za-z\s]*:$')
+
+def iter_normalized_lines(text):
+    """Yields formatted pieces of text line by line.
+
+    Each line is stripped and its internal whitespace collapsed, headings become "### HEADING ###",
+    labels become "**Label:**" and ordinary lines are joined into running text with single spaces.
+    Every step is a single linear scan, so this is safe on multi-megabyte inputs.
+    """
+    for raw_line in _LINE_BREAKS.split(text):
+        line = _HORIZONTAL_WHITESPACE.sub(' ', raw_line).strip()
+        if not line:
+            continue
+        if _HEADING.match(line):
+            yield f"\n### {line} ###\n"
+        elif _LABEL.match(line):
+            yield f"\n**{line}**\n"
+        else:
+            yield line + " "
+
+def normalize_text(text):
+    return ''.join(iter_normalized_lines(text))
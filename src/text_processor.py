@@ -1,23 +1,58 @@
 import logging
 import re
-import spacy
-from spacy.cli import download
+from src.lazy import lazy_import
+from src.token_utils import count_tokens, split_by_tokens
+from src.text_normalizer import normalize_text
+
+spacy = lazy_import('spacy')
+spacy_cli = lazy_import('spacy.cli')
+
+_WHITESPACE = re.compile(r'\s+')
+_UPPERCASE_LINE = re.compile(r'^[A-Z\s]+$')
+_LABEL_LINE = re.compile(r'^[A-Za-z\s]+:$')
+
+# Components of en_core_web_sm that sentence segmentation does not need; the parser sets the boundaries
+NON_SEGMENTATION_COMPONENTS = ["tagger", "attribute_ruler", "lemmatizer", "ner"]
+
+SEGMENTATION_MODES = ("full", "parser", "sentencizer")
 
 class TextProcessor:
-    def __init__(self):
+    def __init__(self, segmentation_mode="full", n_process=1, batch_size=32, max_piece_chars=100000):
+        """segmentation_mode selects the spaCy pipeline used for sentence boundaries:
+
+        - "full": the complete en_core_web_sm pipeline
+        - "parser": en_core_web_sm with only tok2vec and the parser, giving the same boundaries much faster
+        - "sentencizer": spaCy's rule-based sentencizer, fastest but only punctuation aware
+        """
+        if segmentation_mode not in SEGMENTATION_MODES:
+            raise ValueError(f"Unknown segmentation mode: {segmentation_mode}. Expected one of {SEGMENTATION_MODES}.")
+        self.segmentation_mode = segmentation_mode
+        self.n_process = n_process
+        self.batch_size = batch_size
+        self.max_piece_chars = max_piece_chars
+        if segmentation_mode == "sentencizer":
+            self.nlp = spacy.blank("en")
+            self.nlp.add_pipe("sentencizer")
+        elif segmentation_mode == "parser":
+            self.nlp = self._load_model(exclude=NON_SEGMENTATION_COMPONENTS)
+        else:
+            self.nlp = self._load_model()
+
+    @staticmethod
+    def _load_model(**kwargs):
         try:
-            self.nlp = spacy.load("en_core_web_sm")
+            return spacy.load("en_core_web_sm", **kwargs)
         except OSError:
             logging.info("Downloading en_core_web_sm model...")
-            download("en_core_web_sm")
-            self.nlp = spacy.load("en_core_web_sm")
+            spacy_cli.download("en_core_web_sm")
+            return spacy.load("en_core_web_sm", **kwargs)
 
     def preprocess_text(self, text):
         try:
             logging.info("Preprocessing text")
             if not text:
                 raise ValueError("Empty text provided for preprocessing.")
-            text = re.sub(r'\s+', ' ', text)
+            text = _WHITESPACE.sub(' ', text)
             lines = text.split("\n")
             logging.info("Text preprocessed successfully")
             return lines
@@ -30,29 +65,45 @@ class TextProcessor:
             logging.info("Formatting text")
             if not lines:
                 raise ValueError("Empty lines provided for formatting.")
-            formatted_text = ""
-            for line in lines:
-                if re.match(r'^[A-Z\s]+$', line.strip()):
-                    formatted_text += f"\n### {line.strip()} ###\n"
-                elif re.match(r'^[A-Za-z\s]+:$', line.strip()):
-                    formatted_text += f"\n**{line.strip()}**\n"
-                else:
-                    formatted_text += line.strip() + " "
+            formatted_text = "".join(self._format_line(line) for line in lines)
             logging.info("Text formatted successfully")
             return formatted_text
         except Exception as e:
             logging.error(f"Failed to format text: {str(e)}", exc_info=True)
             raise
 
+    def _format_line(self, line):
+        line = line.strip()
+        if _UPPERCASE_LINE.match(line):
+            return f"\n### {line} ###\n"
+        elif _LABEL_LINE.match(line):
+            return f"\n**{line}**\n"
+        else:
+            return line + " "
+
+    def normalize_text(self, text):
+        """Line-aware replacement for preprocess_text followed by format_text.
+
+        preprocess_text collapses newlines before format_text sees them, so headings are never
+        detected; this keeps line structure until headings and labels have been marked up.
+        """
+        try:
+            logging.info("Normalizing text")
+            if not text:
+                raise ValueError("Empty text provided for normalization.")
+            normalized_text = normalize_text(text)
+            logging.info("Text normalized successfully")
+            return normalized_text
+        except Exception as e:
+            logging.error(f"Failed to normalize text: {str(e)}", exc_info=True)
+            raise
+
     def enhance_text_with_nlp(self, text):
         try:
             logging.info("Enhancing text with NLP")
             if not text:
                 raise ValueError("Empty text provided for NLP enhancement.")
-            doc = self.nlp(text)
-            enhanced_text = ""
-            for sent in doc.sents:
-                enhanced_text += sent.text + "\n"
+            enhanced_text = "".join(self.iter_enhance_text_with_nlp([text]))
             logging.info("Text enhanced with NLP successfully")
             return enhanced_text
         except Exception as e:
@@ -73,3 +124,110 @@ class TextProcessor:
         except Exception as e:
             logging.error(f"Failed to chunk text: {str(e)}", exc_info=True)
             raise
+
+    # Streaming stages. Each one consumes an iterable and yields incrementally so only a page
+    # worth of text is held at a time.
+
+    def iter_enhance_text_with_nlp(self, pieces):
+        for sentence, _ in self._iter_sentences_with_context((piece, None) for piece in pieces):
+            yield sentence + "\n"
+
+    def _iter_sentences_with_context(self, pieces_with_context):
+        bounded_pieces = (
+            (bounded, context)
+            for piece, context in pieces_with_context if piece.strip()
+            for bounded in self._split_into_pieces(piece, self.max_piece_chars)
+        )
+        # nlp.pipe batches the pieces and can fan them out to worker processes
+        for doc, context in self.nlp.pipe(bounded_pieces, as_tuples=True, batch_size=self.batch_size, n_process=self.n_process):
+            for sent in doc.sents:
+                yield sent.text, context
+
+    @staticmethod
+    def _split_into_pieces(text, max_chars):
+        """Splits text into pieces of at most max_chars, preferring line breaks, then sentence ends, then spaces."""
+        if len(text) <= max_chars:
+            return [text]
+        pieces = []
+        start = 0
+        while len(text) - start > max_chars:
+            window = text[start:start + max_chars]
+            cut = window.rfind("\n")
+            if cut <= 0:
+                cut = window.rfind(". ") + 1
+            if cut <= 0:
+                cut = window.rfind(" ")
+            if cut <= 0:
+                cut = max_chars
+            pieces.append(text[start:start + cut])
+            start += cut
+        pieces.append(text[start:])
+        return pieces
+
+    @staticmethod
+    def iter_normalized_pages(pages):
+        """Normalizes each non-empty page, yielding (text, page_number) with 1-based page numbers."""
+        for page_number, page_text in enumerate(pages, start=1):
+            if page_text:
+                yield normalize_text(page_text), page_number
+
+    def iter_page_sentence_records(self, normalized_pages, source):
+        """Segments (text, page_number) pairs from iter_normalized_pages into sentence records."""
+        for sentence, page_number in self._iter_sentences_with_context(normalized_pages):
+            yield {'text': sentence, 'source': source, 'page': page_number}
+
+    def iter_token_chunks(self, sentence_records, max_tokens=2000, overlap_tokens=200, model=None):
+        """Packs whole sentences into chunks of at most max_tokens tokens.
+
+        Consecutive chunks share up to overlap_tokens tokens of trailing sentences, chunks never
+        span two source files, and a single sentence longer than the budget is split by tokens.
+        Yields {'text', 'tokens', 'source', 'page_start', 'page_end'} dictionaries.
+        """
+        token_kwargs = {'model': model} if model else {}
+        if overlap_tokens >= max_tokens:
+            raise ValueError("overlap_tokens must be smaller than max_tokens.")
+        window = []  # (text, tokens, page) of the sentences in the current chunk
+        window_tokens = 0
+        current_source = None
+        has_new_content = False
+
+        def make_chunk():
+            return {
+                'text': ' '.join(text for text, _, _ in window),
+                'tokens': window_tokens,
+                'source': current_source,
+                'page_start': window[0][2],
+                'page_end': window[-1][2]
+            }
+
+        for record in sentence_records:
+            text = record['text'].strip()
+            if not text:
+                continue
+            if record['source'] != current_source:
+                if has_new_content:
+                    yield make_chunk()
+                window, window_tokens, has_new_content = [], 0, False
+                current_source = record['source']
+            # One extra token per sentence covers the separator added when sentences are joined
+            tokens = count_tokens(text, **token_kwargs) + 1
+            pieces = [(text, tokens)]
+            if tokens > max_tokens:
+                pieces = [(piece, count_tokens(piece, **token_kwargs) + 1) for piece in split_by_tokens(text, max_tokens - 1, **token_kwargs)]
+            for piece, piece_tokens in pieces:
+                if window_tokens + piece_tokens > max_tokens and has_new_content:
+                    yield make_chunk()
+                    # Carry trailing sentences over as overlap, newest first, within the overlap budget
+                    overlap = []
+                    overlap_total = 0
+                    for item in reversed(window):
+                        if overlap_total + item[1] > overlap_tokens or overlap_total + item[1] + piece_tokens > max_tokens:
+                            break
+                        overlap.insert(0, item)
+                        overlap_total += item[1]
+                    window, window_tokens, has_new_content = overlap, overlap_total, False
+                window.append((piece, piece_tokens, record['page']))
+                window_tokens += piece_tokens
+                has_new_content = True
+        if has_new_content:
+            yield make_chunk()
@@ -0,0 +1,34 @@
+import logging
+from functools import lru_cache
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken is optional; fall back to a character based estimate
+    tiktoken = None
+
+DEFAULT_TOKENIZER_MODEL = "text-embedding-ada-002"
+# Roughly four characters per token for English text, used when tiktoken is unavailable
+CHARS_PER_TOKEN = 4
+
+@lru_cache(maxsize=None)
+def _get_encoding(model):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        logging.info(f"No tokenizer registered for {model}, using cl100k_base")
+        return tiktoken.get_encoding("cl100k_base")
+
+def count_tokens(text, model=DEFAULT_TOKENIZER_MODEL):
+    if tiktoken is None:
+        return len(text) // CHARS_PER_TOKEN + 1
+    return len(_get_encoding(model).encode(text, disallowed_special=()))
+
+def split_by_tokens(text, max_tokens, model=DEFAULT_TOKENIZER_MODEL):
+    """Splits text into consecutive pieces of at most max_tokens tokens each."""
+    if tiktoken is None:
+        # count_tokens adds one token to the estimate, so leave room for it
+        max_chars = max(1, (max_tokens - 1) * CHARS_PER_TOKEN)
+        return [text[i:i + max_chars] for i in range(0, len(text), max_chars)]
+    encoding = _get_encoding(model)
+    tokens = encoding.encode(text, disallowed_special=())
+    return [encoding.decode(tokens[i:i + max_tokens]) for i in range(0, len(tokens), max_tokens)]
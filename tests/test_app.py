@@ -1,10 +1,14 @@
+import os
 import unittest
+
+# Run the workflow against the offline backend so the test makes no API calls
+os.environ.setdefault("LLM_BACKEND", "local")
+
 from src.pdf_extractor import PDFExtractor
 from src.text_processor import TextProcessor
 from src.openai_utils import generate_summary
 from src.docx_utils import save_to_docx
 from docx import Document
-import os
 
 class TestAppIntegration(unittest.TestCase):
     def setUp(self):
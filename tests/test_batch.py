@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from src.batch import discover_jobs, documents_fingerprint, run_batch, summarize_company, company_folder_name, read_status
+from src.config_manager import ConfigManager
+
+def write_file(path, data=b'%PDF-1.4'):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_discover_jobs_from_directory(self):
+        write_file(os.path.join(self.root, 'reports', 'MSFT', '10K.pdf'))
+        write_file(os.path.join(self.root, 'reports', 'MSFT', 'q1', '10Q.pdf'))
+        write_file(os.path.join(self.root, 'reports', 'Apple_10K.pdf'))
+        write_file(os.path.join(self.root, 'reports', 'Apple_10Q.pdf'))
+        jobs = discover_jobs(os.path.join(self.root, 'reports'))
+        self.assertEqual(sorted(jobs), ['Apple', 'MSFT'])
+        self.assertEqual(len(jobs['Apple']), 2)
+        self.assertEqual(len(jobs['MSFT']), 2)
+
+    def test_discover_jobs_from_manifest(self):
+        manifest = os.path.join(self.root, 'manifest.csv')
+        with open(manifest, 'w', encoding='utf-8') as f:
+            f.write("company,path\nAAPL,pdfs/a.pdf\nAAPL,pdfs/b.pdf\nJPM,pdfs/c.pdf\n")
+        jobs = discover_jobs(manifest)
+        self.assertEqual(jobs['AAPL'], [os.path.join(self.root, 'pdfs', 'a.pdf'), os.path.join(self.root, 'pdfs', 'b.pdf')])
+        self.assertEqual(list(jobs), ['AAPL', 'JPM'])
+
+    def test_fingerprint_ignores_order(self):
+        documents = [('a.pdf', b'one'), ('b.pdf', b'two')]
+        self.assertEqual(documents_fingerprint(documents), documents_fingerprint(documents[::-1]))
+        self.assertNotEqual(documents_fingerprint(documents), documents_fingerprint([('a.pdf', b'one')]))
+
+    def test_company_folder_name(self):
+        self.assertEqual(company_folder_name('Berkshire Hathaway / B'), 'Berkshire_Hathaway_B')
+
+    def test_summarize_company_resumes(self):
+        pdf_path = os.path.join(self.root, 'reports', 'AAPL', '10K.pdf')
+        write_file(pdf_path)
+        output_root = os.path.join(self.root, 'output')
+        result = mock.Mock(num_pages=3, num_chunks=2)
+        with mock.patch('src.batch.run_pipeline', return_value=result) as run_pipeline:
+            first = summarize_company('AAPL', [pdf_path], output_root, resources=None)
+            second = summarize_company('AAPL', [pdf_path], output_root, resources=None)
+            write_file(pdf_path, b'%PDF-1.4 amended')
+            third = summarize_company('AAPL', [pdf_path], output_root, resources=None)
+        self.assertEqual([first['status'], second['status'], third['status']], ['completed', 'skipped', 'completed'])
+        self.assertEqual(run_pipeline.call_count, 2)
+        self.assertEqual(run_pipeline.call_args.kwargs['state_path'], os.path.join(output_root, 'AAPL', 'summary_state.json'))
+        self.assertEqual(read_status(os.path.join(output_root, 'AAPL'))['pages'], 3)
+
+    def test_run_batch_divides_extraction_workers(self):
+        with mock.patch.dict(os.environ, {'PDF_EXTRACTION_WORKERS': '8'}):
+            config = ConfigManager()
+        with mock.patch('src.batch.PipelineResources') as resources:
+            run_batch({}, output_root=os.path.join(self.root, 'output'), max_workers=3, config=config)
+        self.assertEqual(resources.call_args.args[0].get_pdf_extraction_workers(), 2)
+        self.assertEqual(config.get_pdf_extraction_workers(), 8)
+
+    def test_summarize_company_reports_failures(self):
+        with mock.patch('src.batch.run_pipeline', side_effect=ValueError("No valid text chunks")):
+            write_file(os.path.join(self.root, 'x.pdf'))
+            outcome = summarize_company('X', [os.path.join(self.root, 'x.pdf')], self.root, resources=None)
+        self.assertEqual(outcome['status'], 'failed')
+        self.assertIn("No valid text chunks", outcome['error'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import tempfile
+import unittest
+import uuid
+from unittest import mock
+import chromadb
+from src import chromadb_utils
+from src.chromadb_utils import (
+    get_client, get_or_create_collection, get_stored_embeddings, upsert_embeddings,
+    make_document_hash, make_chunk_id
+)
+
+class TestChromaDBUtils(unittest.TestCase):
+    def setUp(self):
+        # Keep test collections out of the real CHROMADB_PERSIST_DIRECTORY
+        self.tmp = tempfile.TemporaryDirectory()
+        self.client_patch = mock.patch.object(chromadb_utils, '_client', chromadb.PersistentClient(path=self.tmp.name))
+        self.client_patch.start()
+        self.collection_name = f"test_{uuid.uuid4().hex}"
+        self.collection = get_or_create_collection(self.collection_name)
+
+    def tearDown(self):
+        get_client().delete_collection(self.collection_name)
+        self.client_patch.stop()
+        self.tmp.cleanup()
+
+    def test_chunk_ids_are_stable_and_document_scoped(self):
+        document_hash = make_document_hash(b"pdf bytes")
+        self.assertEqual(make_chunk_id(document_hash, "chunk"), make_chunk_id(document_hash, "chunk"))
+        self.assertNotEqual(make_chunk_id(document_hash, "chunk"), make_chunk_id(document_hash, "other chunk"))
+        self.assertNotEqual(make_chunk_id(document_hash, "chunk"), make_chunk_id(make_document_hash(b"other"), "chunk"))
+
+    def test_upsert_is_idempotent(self):
+        ids = ["doc-a", "doc-b", "doc-a"]
+        embeddings = [[1.0, 0.0], [0.0, 1.0], [1.0, 0.0]]
+        metadatas = [{'text': "a"}, {'text': "b"}, {'text': "a"}]
+        upsert_embeddings(self.collection, ids, embeddings, metadatas)
+        upsert_embeddings(self.collection, ids, embeddings, metadatas)
+        self.assertEqual(self.collection.count(), 2)
+        stored = get_stored_embeddings(self.collection, ["doc-a", "doc-missing"])
+        self.assertEqual(list(stored), ["doc-a"])
+        self.assertEqual([float(value) for value in stored["doc-a"]], [1.0, 0.0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+import numpy as np
+from src.clustering import to_embedding_matrix, group_by_cluster, cluster_embeddings
+
+class TestClustering(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        centers = np.eye(3, 16) * 10
+        self.embeddings = [(centers[i % 3] + rng.normal(scale=0.1, size=16)).tolist() for i in range(60)]
+
+    def test_to_embedding_matrix(self):
+        matrix = to_embedding_matrix(self.embeddings)
+        self.assertEqual(matrix.dtype, np.float32)
+        self.assertEqual(matrix.shape, (60, 16))
+        self.assertTrue(matrix.flags['C_CONTIGUOUS'])
+
+    def test_group_by_cluster(self):
+        groups = group_by_cluster([1, 0, 1, 2, 0], 4)
+        self.assertEqual([group.tolist() for group in groups], [[1, 4], [0, 2], [3], []])
+
+    def test_cluster_embeddings_picks_k_automatically(self):
+        labels, groups = cluster_embeddings(self.embeddings, num_clusters=None, min_clusters=2, max_clusters=6)
+        self.assertEqual(len(groups), 3)
+        self.assertEqual(sorted(len(group) for group in groups), [20, 20, 20])
+        self.assertEqual(len(labels), 60)
+
+    def test_cluster_embeddings_caps_k_at_sample_count(self):
+        _, groups = cluster_embeddings(self.embeddings[:2], num_clusters=5)
+        self.assertEqual(len(groups), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,28 @@
+import unittest
+from src.dedup import NearDuplicateFilter
+
+BOILERPLATE = ("The Company's business, reputation, results of operations, financial condition and stock price can be "
+               "affected by a number of factors, whether currently known or unknown, including those described below. "
+               "When any one or more of these risks materialize from time to time, the Company's business could be "
+               "materially adversely affected.")
+
+class TestNearDuplicateFilter(unittest.TestCase):
+    def test_removes_near_duplicates(self):
+        chunks = [
+            {'text': BOILERPLATE, 'source': '10-K.pdf'},
+            {'text': "iPhone net sales increased during the quarter due to higher sales of Pro models.", 'source': '10-Q.pdf'},
+            {'text': BOILERPLATE.replace("stock price", "share price"), 'source': '10-Q.pdf'},
+        ]
+        dedup_filter = NearDuplicateFilter(threshold=0.7)
+        kept = list(dedup_filter.filter(chunks))
+        self.assertEqual([chunk['source'] for chunk in kept], ['10-K.pdf', '10-Q.pdf'])
+        self.assertEqual(dedup_filter.removed, 1)
+
+    def test_keeps_distinct_text(self):
+        dedup_filter = NearDuplicateFilter()
+        self.assertFalse(dedup_filter.is_duplicate("Services revenue reached an all-time record."))
+        self.assertFalse(dedup_filter.is_duplicate("Greater China net sales decreased year over year."))
+        self.assertTrue(dedup_filter.is_duplicate("Services revenue reached an all-time record."))
+
+if __name__ == '__main__':
+    unittest.main()
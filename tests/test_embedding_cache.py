@@ -0,0 +1,31 @@
+import os
+import shutil
+import tempfile
+import unittest
+from src.embedding_cache import EmbeddingCache
+
+class TestEmbeddingCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = EmbeddingCache(os.path.join(self.cache_dir, 'embeddings.sqlite3'), max_entries=2)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_round_trip_is_keyed_by_model(self):
+        self.cache.put_many("model-a", ["revenue grew"], [[0.25, 0.5]])
+        self.assertEqual(self.cache.get("model-a", "revenue grew"), [0.25, 0.5])
+        self.assertIsNone(self.cache.get("model-b", "revenue grew"))
+        self.assertIsNone(self.cache.get("model-a", "revenue fell"))
+
+    def test_evicts_least_recently_used(self):
+        self.cache.put_many("model-a", ["first"], [[1.0]])
+        self.cache.put_many("model-a", ["second"], [[2.0]])
+        self.cache.get("model-a", "first")
+        self.cache.put_many("model-a", ["third"], [[3.0]])
+        self.assertIsNone(self.cache.get("model-a", "second"))
+        self.assertEqual(self.cache.get("model-a", "first"), [1.0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import os
+import re
+import tempfile
+import unittest
+from unittest import mock
+from src.config_manager import ConfigManager
+from src.incremental import load_state, save_state, state_settings, update_clusters
+from src.pipeline import PipelineResources, run_pipeline
+from src.reduce import reduce_groups
+
+_CLUSTER_TEMPLATE = re.compile(r'^Summarize the financial reports for cluster (\d+):$')
+
+class TestIncremental(unittest.TestCase):
+    def setUp(self):
+        self.clusters = [
+            {'chunk_ids': ['a', 'b'], 'summary': "Revenue grew."},
+            {'chunk_ids': ['c'], 'summary': "Margins fell."}
+        ]
+
+    def test_state_round_trip_requires_same_settings(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'AAPL', 'summary_state.json')
+            self.assertIsNone(load_state(path, {'version': 1}))
+            save_state(path, {'version': 1}, self.clusters)
+            self.assertEqual(load_state(path, {'version': 1}), self.clusters)
+            self.assertIsNone(load_state(path, {'version': 1, 'llm_backend': 'local'}))
+
+    def test_unchanged_chunks_keep_their_clusters(self):
+        groups, changed = update_clusters(self.clusters, ['a', 'b', 'c'], [[1.0, 0.0], [0.9, 0.1], [0.0, 1.0]])
+        self.assertEqual(groups, [[0, 1], [2]])
+        self.assertEqual(changed, set())
+
+    def test_new_chunks_join_nearest_cluster(self):
+        embeddings = [[1.0, 0.0], [0.9, 0.1], [0.0, 1.0], [0.1, 0.9], [0.95, 0.05]]
+        groups, changed = update_clusters(self.clusters, ['a', 'b', 'c', 'd', 'e'], embeddings)
+        self.assertEqual(groups, [[0, 1, 4], [2, 3]])
+        self.assertEqual(changed, {0, 1})
+
+    def test_removed_chunks_mark_cluster_changed(self):
+        groups, changed = update_clusters(self.clusters, ['a', 'c'], [[1.0, 0.0], [0.0, 1.0]])
+        self.assertEqual(groups, [[0], [1]])
+        self.assertEqual(changed, {0})
+        self.assertIsNone(update_clusters(self.clusters, ['x'], [[1.0, 0.0]]))
+
+    def test_mostly_new_chunks_are_clustered_again(self):
+        clusters = [{'chunk_ids': [f"{index}-{i}" for i in range(10)], 'summary': None} for index in range(5)]
+        chunk_ids = ['0-0'] + [f"new-{i}" for i in range(200)]
+        embeddings = [[1.0, 0.0]] + [[float(i % 7), 1.0] for i in range(200)]
+        self.assertIsNone(update_clusters(clusters, chunk_ids, embeddings))
+        # As many kept chunks as new ones is still an update
+        chunk_ids = [f"0-{i}" for i in range(10)] + [f"new-{i}" for i in range(10)]
+        groups, changed = update_clusters(clusters, chunk_ids, [[1.0, 0.0]] * 20)
+        self.assertEqual(groups[0], list(range(20)))
+        self.assertEqual(changed, set(range(5)))
+
+class TestIncrementalPipeline(unittest.TestCase):
+    """Runs the pipeline on one filing and then again after a second filing arrives."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        env = {
+            'LLM_BACKEND': 'local',
+            'CHROMADB_PERSIST_DIRECTORY': os.path.join(root, 'chroma_db'),
+            'TEXT_CACHE_DIRECTORY': os.path.join(root, 'cache', 'text'),
+            'EMBEDDING_CACHE_PATH': os.path.join(root, 'cache', 'embeddings.sqlite3'),
+            'RESPONSE_CACHE_PATH': os.path.join(root, 'cache', 'responses.sqlite3'),
+            'METRICS_REPORT_DIRECTORY': '',
+            'NUM_CLUSTERS': '3',
+            'SEGMENTATION_MODE': 'sentencizer',
+            'PDF_EXTRACTION_WORKERS': '1',
+            'TABLE_FACTS_ENABLED': 'false'
+        }
+        with mock.patch.dict(os.environ, env):
+            self.config = ConfigManager()
+        # Every store and the backend come from this config alone
+        self.resources = PipelineResources(self.config)
+        self.output_dir = os.path.join(root, 'output', 'AAPL')
+        self.state_path = os.path.join(self.output_dir, 'summary_state.json')
+        self.filings = []
+        for path in ('tests/Apple_10Q.pdf', 'data/JPM_AAPL_report.pdf'):
+            with open(path, 'rb') as f:
+                self.filings.append((os.path.basename(path), f.read()))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def summarized_clusters(self, documents):
+        """Runs the pipeline and returns the indices of the clusters it sent summary requests for."""
+        with mock.patch('src.pipeline.reduce_groups', wraps=reduce_groups) as reduce:
+            run_pipeline(documents, output_dir=self.output_dir, config=self.config, resources=self.resources,
+                         state_path=self.state_path)
+        return {int(_CLUSTER_TEMPLATE.match(template).group(1)) - 1 for texts, template in reduce.call_args.args[0]}
+
+    def test_only_changed_clusters_are_summarized_again(self):
+        settings = state_settings(self.config)
+        first = self.summarized_clusters(self.filings[:1])
+        before = load_state(self.state_path, settings)
+        self.assertEqual(first, set(range(len(before))))
+
+        second = self.summarized_clusters(self.filings)
+        after = load_state(self.state_path, settings)
+        self.assertEqual(len(after), len(before))
+        changed = {index for index, (old, new) in enumerate(zip(before, after)) if old['chunk_ids'] != new['chunk_ids']}
+        self.assertTrue(changed)
+        self.assertEqual(second, changed)
+        for index in set(range(len(after))) - changed:
+            self.assertEqual(after[index]['summary'], before[index]['summary'])
+        self.assertTrue(os.path.exists(os.path.join(self.output_dir, 'summary2page.docx')))
+
+        self.assertEqual(self.summarized_clusters(self.filings), set())
+        self.assertEqual(self.resources.backend.name, 'local')
+        self.assertTrue(os.path.isdir(os.path.join(self.tmp.name, 'chroma_db')))
+
+    def test_state_from_other_filters_is_not_reused(self):
+        settings = state_settings(self.config)
+        with mock.patch.dict(os.environ, {'DEDUP_ENABLED': 'false'}):
+            other = state_settings(ConfigManager())
+        self.assertNotEqual(settings, other)
+
+if __name__ == '__main__':
+    unittest.main()
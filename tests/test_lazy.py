@@ -0,0 +1,27 @@
+import subprocess
+import sys
+import unittest
+from src.lazy import LazyModule, lazy_import
+
+class TestLazyImport(unittest.TestCase):
+    def test_imports_on_first_attribute_access(self):
+        module = LazyModule('colorsys')
+        self.assertIn("not loaded", repr(module))
+        self.assertEqual(module.rgb_to_hsv(1.0, 0.0, 0.0), (0.0, 1.0, 1.0))
+        self.assertIn("(loaded)", repr(module))
+
+    def test_returns_already_imported_modules(self):
+        self.assertIs(lazy_import('sys'), sys)
+
+    def test_src_modules_do_not_import_heavy_dependencies(self):
+        heavy = ('spacy', 'sklearn', 'chromadb', 'openai', 'pdfplumber', 'pandas', 'docx')
+        probe = (
+            "import sys\n"
+            "import src.pipeline, src.batch\n"
+            f"print(','.join(name for name in {heavy!r} if name in sys.modules))"
+        )
+        completed = subprocess.run([sys.executable, '-c', probe], capture_output=True, text=True, check=True)
+        self.assertEqual(completed.stdout.strip(), '')
+
+if __name__ == '__main__':
+    unittest.main()
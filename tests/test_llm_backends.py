@@ -0,0 +1,71 @@
+import asyncio
+import os
+import tempfile
+import unittest
+import numpy as np
+from src.llm_backends import LocalBackend, RetryableBackendError, create_backend
+from src.openai_utils import generate_embeddings_batch, generate_summaries, generate_summary_stream
+from src.response_cache import ResponseCache
+
+class TestLocalBackend(unittest.TestCase):
+    def test_embeddings_are_deterministic_and_normalized(self):
+        backend = LocalBackend(dimensions=64)
+        first = backend.embed(["iPhone net sales increased", "Services revenue grew"], "test-model")
+        second = LocalBackend(dimensions=64).embed(["iPhone net sales increased", "Services revenue grew"], "test-model")
+        self.assertEqual(first, second)
+        self.assertEqual(len(first[0]), 64)
+        self.assertAlmostEqual(float(np.linalg.norm(first[0])), 1.0, places=5)
+
+    def test_summary_follows_template_sections(self):
+        backend = LocalBackend()
+        prompt = "#### Revenue\n- points\n#### Risks\n- points\n\nRevenue grew 8%. Supply risks remain elevated."
+        summary = asyncio.run(backend.complete_async([{'role': 'user', 'content': prompt}], "test-model"))
+        self.assertIn("#### Revenue", summary)
+        self.assertIn("#### Risks", summary)
+        self.assertIn("Revenue grew 8%.", summary)
+
+    def test_simulated_rate_limit(self):
+        backend = LocalBackend(requests_per_minute=2)
+        backend.embed(["a"], "test-model")
+        backend.embed(["b"], "test-model")
+        with self.assertRaises(RetryableBackendError):
+            backend.embed(["c"], "test-model")
+
+    def test_openai_utils_run_against_local_backend(self):
+        backend = LocalBackend(dimensions=32)
+        embeddings = generate_embeddings_batch(["alpha", "beta", "gamma"], max_batch_size=2, backend=backend)
+        self.assertEqual(len(embeddings), 3)
+        summaries = generate_summaries([("Net sales rose.", "Summarize:")], backend=backend)
+        self.assertEqual(len(summaries), 1)
+        self.assertIn("Net sales rose.", summaries[0])
+
+    def test_streamed_summary_is_cached_whole(self):
+        backend = LocalBackend()
+        text = "Net sales rose 8% on strong iPhone demand. Services reached a record."
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = ResponseCache(os.path.join(cache_dir, 'responses.sqlite3'))
+            pieces = list(generate_summary_stream(text, "Summarize:", cache=cache, backend=backend))
+            self.assertGreater(len(pieces), 1)
+            self.assertEqual("".join(pieces), backend.complete([{'role': 'user', 'content': f"Summarize:\n\n{text}"}], "test-model"))
+            self.assertEqual(list(generate_summary_stream(text, "Summarize:", cache=cache, backend=backend)), ["".join(pieces)])
+            cache.close()
+
+    def test_generate_summaries_closes_backend_before_loop_ends(self):
+        class ClosingBackend(LocalBackend):
+            closed = 0
+
+            async def aclose(self):
+                asyncio.get_running_loop()
+                ClosingBackend.closed += 1
+
+        backend = ClosingBackend()
+        generate_summaries([("Net sales rose.", "Summarize:")], backend=backend)
+        generate_summaries([("Margins fell.", "Summarize:")], backend=backend)
+        self.assertEqual(ClosingBackend.closed, 2)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            create_backend("unknown")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import asyncio
+import json
+import tempfile
+import unittest
+import urllib.request
+from src.metrics import RunMetrics, MetricsRegistry, llm_call, record_cache, record_tokens, start_metrics_server, REGISTRY
+
+class TestRunMetrics(unittest.TestCase):
+    def test_counters_are_attributed_to_the_running_stage(self):
+        metrics = RunMetrics()
+        with metrics.activate():
+            with metrics.stage('embedding'):
+                record_cache('embedding', True)
+                record_cache('embedding', False)
+                with llm_call('embeddings', 'test-model'):
+                    record_tokens('embeddings', 'test-model', 40)
+
+            async def summarize():
+                with llm_call('chat', 'test-model'):
+                    record_tokens('chat', 'test-model', 100, 20)
+
+            with metrics.stage('summarization'):
+                asyncio.run(summarize())
+                with self.assertRaises(ValueError):
+                    with llm_call('chat', 'test-model'):
+                        raise ValueError("boom")
+        metrics.finish()
+
+        report = metrics.to_dict()
+        self.assertEqual(report['stages']['embedding']['cache_hit_rate'], 0.5)
+        self.assertEqual(report['stages']['embedding']['prompt_tokens'], 40)
+        self.assertEqual(report['stages']['summarization']['llm_calls'], 2)
+        self.assertEqual(report['stages']['summarization']['completion_tokens'], 20)
+        self.assertEqual(report['totals']['prompt_tokens'], 140)
+        chat = [entry for entry in report['llm_calls'] if entry['operation'] == 'chat'][0]
+        self.assertEqual(chat['failures'], 1)
+
+        with tempfile.TemporaryDirectory() as report_dir:
+            with open(metrics.write_report(report_dir), 'r', encoding='utf-8') as f:
+                self.assertEqual(json.load(f)['run_id'], metrics.run_id)
+
+    def test_recording_without_an_active_run_is_a_no_op(self):
+        record_cache('response', True)
+        record_tokens('chat', 'test-model', 10, 10)
+        with llm_call('chat', 'test-model'):
+            pass
+
+    def test_prometheus_text(self):
+        metrics = RunMetrics()
+        with metrics.activate(), metrics.stage('summarization'):
+            with llm_call('chat', 'test-model'):
+                record_tokens('chat', 'test-model', 7, 3)
+            record_cache('response', False)
+        registry = MetricsRegistry()
+        registry.add(metrics)
+        text = registry.to_prometheus()
+        self.assertIn('summarizer_runs_total 1', text)
+        self.assertIn('summarizer_llm_tokens_total{stage="summarization",operation="chat",model="test-model",kind="prompt"} 7', text)
+        self.assertIn('summarizer_cache_lookups_total{stage="summarization",cache="response",result="miss"} 1', text)
+
+    def test_metrics_endpoint(self):
+        server = start_metrics_server(0, host='127.0.0.1')
+        self.assertIs(start_metrics_server(0, host='127.0.0.1'), server)
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_port}/metrics") as response:
+            body = response.read().decode('utf-8')
+        self.assertIn('# TYPE summarizer_runs_total counter', body)
+        self.assertEqual(body, REGISTRY.to_prometheus())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import asyncio
+import json
+import os
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from src.llm_backends import OpenAIBackend
+from src.openai_utils import generate_embeddings_batch, generate_summaries_async, RateLimiter
+
+class StandInEmbeddingsHandler(BaseHTTPRequestHandler):
+    """Minimal stand-in for the OpenAI API.
+
+    The embeddings endpoint rejects its first request with a 429; the chat endpoint echoes the
+    prompt and fails permanently for prompts containing "fail".
+    """
+    requests_seen = []
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        if self.path.endswith('/chat/completions'):
+            self._chat_completion(body)
+            return
+        with self.lock:
+            self.requests_seen.append(body['input'])
+            first_request = len(self.requests_seen) == 1
+        if first_request:
+            self._respond(429, {"error": {"message": "Rate limit reached", "type": "rate_limit_error"}})
+            return
+        # Vectors encode the input length and are returned in reverse order to exercise reordering
+        data = [{"object": "embedding", "index": i, "embedding": [float(len(text)), float(i)]} for i, text in enumerate(body['input'])]
+        self._respond(200, {"object": "list", "data": list(reversed(data)), "model": body['model'],
+                            "usage": {"prompt_tokens": 1, "total_tokens": 1}})
+
+    def _chat_completion(self, body):
+        prompt = body['messages'][-1]['content']
+        if 'fail' in prompt:
+            self._respond(400, {"error": {"message": "Bad request", "type": "invalid_request_error"}})
+            return
+        self._respond(200, {
+            "id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": body['model'],
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": f"Summary of {prompt}"}}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+        })
+
+    def _respond(self, status, payload):
+        encoded = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def log_message(self, format, *args):
+        pass
+
+class TestOpenAIUtils(unittest.TestCase):
+    def setUp(self):
+        StandInEmbeddingsHandler.requests_seen = []
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StandInEmbeddingsHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}/v1"
+        self.backend = OpenAIBackend("test-key", base_url=self.base_url)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_generate_embeddings_batch(self):
+        texts = ["a" * (i + 1) for i in range(10)]
+        embeddings = generate_embeddings_batch(iter(texts), max_batch_size=3, max_workers=3, backend=self.backend)
+        self.assertEqual([embedding[0] for embedding in embeddings], [float(len(text)) for text in texts])
+        # Four batches plus the one rejected request that was retried
+        self.assertEqual(len(StandInEmbeddingsHandler.requests_seen), 5)
+        self.assertTrue(all(len(batch) <= 3 for batch in StandInEmbeddingsHandler.requests_seen))
+
+    def test_generate_summaries_async_returns_partial_results(self):
+        requests = [("cluster one", "Summarize:"), ("fail", "Summarize:"), ("cluster three", "Summarize:")]
+        summaries = asyncio.run(generate_summaries_async(requests, max_concurrency=2, max_retries=1, backend=self.backend))
+        self.assertEqual(len(summaries), 3)
+        self.assertIn("cluster one", summaries[0])
+        self.assertIsNone(summaries[1])
+        self.assertIn("cluster three", summaries[2])
+
+    def test_rate_limiter_allows_burst_up_to_limit(self):
+        limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=1000)
+        for _ in range(5):
+            limiter.acquire(100)
+        self.assertLess(limiter._request_allowance, 60)
+
+if __name__ == '__main__':
+    unittest.main()
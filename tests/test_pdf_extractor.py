@@ -1,3 +1,4 @@
+import io
 import unittest
 from src.pdf_extractor import PDFExtractor
 
@@ -8,6 +9,46 @@ class TestPDFExtractor(unittest.TestCase):
         self.assertTrue(len(text) > 0)
         self.assertIn("UNITED STATES", text)  # Example assertion
 
+    def test_extract_text_parallel_matches_serial(self):
+        serial_text = PDFExtractor('tests/Apple_10Q.pdf').extract_text()
+        parallel_text = PDFExtractor('tests/Apple_10Q.pdf', num_workers=3).extract_text()
+        self.assertEqual(serial_text, parallel_text)
+
+    def test_extract_text_from_memory_matches_path(self):
+        path_text = PDFExtractor('tests/Apple_10Q.pdf').extract_text()
+        with open('tests/Apple_10Q.pdf', 'rb') as f:
+            pdf_bytes = f.read()
+        self.assertEqual(PDFExtractor(pdf_bytes).extract_text(), path_text)
+        self.assertEqual(PDFExtractor(memoryview(pdf_bytes)).extract_text(), path_text)
+        self.assertEqual(PDFExtractor(io.BytesIO(pdf_bytes)).extract_text(), path_text)
+
+    def test_extract_text_parallel_from_bytes_matches_serial(self):
+        with open('tests/Apple_10Q.pdf', 'rb') as f:
+            pdf_bytes = f.read()
+        serial_text = PDFExtractor(pdf_bytes).extract_text()
+        parallel_text = PDFExtractor(pdf_bytes, num_workers=3).extract_text()
+        self.assertEqual(serial_text, parallel_text)
+
+    def test_collect_tables_in_the_same_pass(self):
+        serial = PDFExtractor('tests/Apple_10Q.pdf', collect_tables=True)
+        self.assertEqual(''.join(serial.iter_pages()), PDFExtractor('tests/Apple_10Q.pdf').extract_text())
+        self.assertTrue(serial.tables)
+        parallel = PDFExtractor('tests/Apple_10Q.pdf', num_workers=3, collect_tables=True)
+        list(parallel.iter_pages())
+        self.assertEqual(parallel.tables, serial.tables)
+
+    def test_picklable_source_keeps_file_position(self):
+        with open('tests/Apple_10Q.pdf', 'rb') as f:
+            f.seek(10)
+            pdf_bytes = PDFExtractor(f)._picklable_source()
+            self.assertEqual(f.tell(), 10)
+        with open('tests/Apple_10Q.pdf', 'rb') as f:
+            self.assertEqual(pdf_bytes, f.read())
+
+    def test_split_page_range(self):
+        ranges = PDFExtractor._split_page_range(10, 3)
+        self.assertEqual(ranges, [(0, 4), (4, 7), (7, 10)])
+        self.assertEqual(PDFExtractor._split_page_range(2, 8), [(0, 1), (1, 2)])
+
 if __name__ == '__main__':
     unittest.main()
-
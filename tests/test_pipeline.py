@@ -0,0 +1,52 @@
+import json
+import tempfile
+import unittest
+from types import SimpleNamespace
+from src.chromadb_utils import make_chunk_id, make_document_hash
+from src.pipeline import document_sources, iter_unindexed_chunks, stream_document_sentences
+from src.stage_timer import StageTimer
+from src.text_cache import TextCache
+
+class FakeCollection:
+    """Records each read of a collection that stores the given ids."""
+
+    def __init__(self, stored_ids):
+        self.stored_ids = set(stored_ids)
+        self.reads = []
+
+    def get(self, ids, include):
+        self.reads.append(list(ids))
+        found = [chunk_id for chunk_id in ids if chunk_id in self.stored_ids]
+        return {'ids': found, 'embeddings': [[1.0, 0.0] for _ in found]}
+
+class TestPipeline(unittest.TestCase):
+    def test_document_sources_number_repeated_names(self):
+        documents = [('10K.pdf', b'a'), ('10Q.pdf', b'b'), ('10K.pdf', b'c')]
+        self.assertEqual(document_sources(documents), ['10K.pdf', '10Q.pdf', '10K.pdf (2)'])
+
+    def test_unindexed_chunks_are_looked_up_in_batches(self):
+        document_hashes = {'10K.pdf': make_document_hash(b'pdf')}
+        chunks = [{'text': f"chunk {i}", 'source': '10K.pdf'} for i in range(5)]
+        stored_id = make_chunk_id(document_hashes['10K.pdf'], "chunk 1")
+        collection = FakeCollection([stored_id])
+        stored_embeddings = {}
+        new_chunks = list(iter_unindexed_chunks(chunks, document_hashes, collection, stored_embeddings, batch_size=2))
+        self.assertEqual(len(collection.reads), 3)
+        self.assertEqual([chunk['text'] for chunk in new_chunks], ["chunk 0", "chunk 2", "chunk 3", "chunk 4"])
+        self.assertEqual(list(stored_embeddings), [stored_id])
+
+    def test_page_count_is_reported_when_sentences_are_cached(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            text_cache = TextCache(cache_dir, 10 * 1024 * 1024)
+            key = text_cache.document_key(b'pdf')
+            text_cache.set(key, 'sentences-parser', json.dumps([["Net sales rose.", 1], ["Margins fell.", 2]]))
+            text_cache.set(key, 'page_count', "5")
+            processor = SimpleNamespace(segmentation_mode='parser')
+            document_hashes, page_counts = {}, {}
+            records = list(stream_document_sentences([('10K.pdf', b'pdf')], processor, text_cache, StageTimer(), None,
+                                                     document_hashes, page_counts))
+        self.assertEqual(len(records), 2)
+        self.assertEqual(page_counts, {'10K.pdf': 5})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+from src.llm_backends import LocalBackend
+from src.openai_utils import SUMMARY_MODEL
+from src.reduce import MERGE_TEMPLATE, fit_to_budget, pack_by_tokens, reduce_groups, text_budget, trim_to_budget
+from src.token_utils import count_tokens
+
+class RecordingBackend(LocalBackend):
+    """Local backend that remembers every prompt it was sent."""
+
+    def __init__(self):
+        super().__init__()
+        self.prompts = []
+        self.request_tokens = []
+
+    def _reply(self, messages, model):
+        self.prompts.append(messages[-1]['content'])
+        self.request_tokens.append(sum(count_tokens(message['content'], SUMMARY_MODEL) for message in messages))
+        return super()._reply(messages, model)
+
+def sentences(count, prefix="Revenue"):
+    return [f"{prefix} item {i} grew by {i} percent in the quarter." for i in range(count)]
+
+class TestReduce(unittest.TestCase):
+    def test_pack_by_tokens_respects_budget(self):
+        texts = sentences(40) + ["word " * 400]
+        batches = pack_by_tokens(texts, 60)
+        self.assertGreater(len(batches), 1)
+        for batch in batches:
+            self.assertLessEqual(count_tokens(batch, SUMMARY_MODEL), 60)
+        self.assertEqual(pack_by_tokens(sentences(2), 1000), [" ".join(sentences(2))])
+
+    def test_small_group_is_summarized_in_one_request(self):
+        backend = RecordingBackend()
+        results = reduce_groups([(sentences(3), "Summarize:")], 1000, backend=backend)
+        self.assertEqual(len(backend.prompts), 1)
+        self.assertTrue(backend.prompts[0].endswith(" ".join(sentences(3))))
+        self.assertIsNotNone(results[0])
+
+    def test_oversized_groups_are_reduced_within_budget(self):
+        backend = RecordingBackend()
+        groups = [(sentences(60), "Summarize cluster 1:"), (sentences(2, "Margin"), "Summarize cluster 2:")]
+        results = reduce_groups(groups, 300, backend=backend)
+        self.assertEqual(len(results), 2)
+        self.assertTrue(all(result for result in results))
+        self.assertTrue(any(prompt.startswith(MERGE_TEMPLATE) for prompt in backend.prompts))
+        # The budget covers the whole request, prompt and template included
+        for tokens in backend.request_tokens:
+            self.assertLessEqual(tokens, 300)
+
+    def test_fit_to_budget(self):
+        backend = RecordingBackend()
+        self.assertEqual(fit_to_budget(["short", "text"], 100, backend=backend), "short\ntext")
+        self.assertEqual(backend.prompts, [])
+        merged = fit_to_budget(sentences(80), 150, request_budget=300, backend=backend)
+        self.assertLessEqual(count_tokens(merged, SUMMARY_MODEL), 150)
+        self.assertTrue(backend.prompts)
+        for tokens in backend.request_tokens:
+            self.assertLessEqual(tokens, 300)
+
+    def test_trim_to_budget_keeps_whole_lines(self):
+        text = "\n".join(sentences(50))
+        trimmed = trim_to_budget(text, 100)
+        self.assertLessEqual(count_tokens(trimmed, SUMMARY_MODEL), 100)
+        self.assertTrue(text.startswith(trimmed))
+        self.assertTrue(all(line in sentences(50) for line in trimmed.split("\n")))
+        self.assertEqual(trim_to_budget("short", 100), "short")
+
+    def test_budget_must_leave_room_for_text(self):
+        with self.assertRaises(ValueError):
+            text_budget(10, "Summarize:")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+from src.relevance import BOILERPLATE_PATTERNS, filter_relevant_chunks, score_chunks, build_section_queries
+from src.templates import template_2_page
+
+class TestRelevance(unittest.TestCase):
+    def setUp(self):
+        self.chunks = [
+            {'text': "Net sales by reportable segment: Americas, Europe, Greater China, Japan and Rest of Asia Pacific sales grew year over year."},
+            {'text': "SIGNATURES Pursuant to the requirements of the Securities Exchange Act of 1934, the Registrant has duly caused this report to be signed."},
+            {'text': "The Company's credit rating outlook was affirmed by the rating agencies during the year."},
+            {'text': "Exhibit Index 31.1 Rule 13a-14(a) / 15d-14(a) Certification of Chief Executive Officer."},
+        ]
+
+    def test_boilerplate_scores_lowest(self):
+        scores = score_chunks([chunk['text'] for chunk in self.chunks], build_section_queries(template_2_page))
+        self.assertGreater(min(scores[0], scores[2]), max(scores[1], scores[3]))
+
+    def test_body_text_incorporated_by_reference_is_not_boilerplate(self):
+        text = "Net sales and segment results are discussed in the Annual Report, which is incorporated by reference herein."
+        self.assertIsNone(BOILERPLATE_PATTERNS.search(text))
+
+    def test_filter_keeps_ratio_in_original_order(self):
+        kept, dropped = filter_relevant_chunks(self.chunks, template_2_page, keep_ratio=0.5)
+        self.assertEqual(dropped, 2)
+        self.assertEqual(kept, [self.chunks[0], self.chunks[2]])
+
+    def test_keep_ratio_of_one_keeps_everything(self):
+        kept, dropped = filter_relevant_chunks(iter(self.chunks), template_2_page, keep_ratio=1.0)
+        self.assertEqual((len(kept), dropped), (4, 0))
+
+if __name__ == '__main__':
+    unittest.main()
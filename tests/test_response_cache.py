@@ -0,0 +1,48 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from src.response_cache import ResponseCache
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.cache_dir, 'responses.sqlite3')
+        self.cache = ResponseCache(self.db_path, max_memory_entries=1, max_disk_entries=2, ttl_seconds=60)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_key_depends_on_every_input(self):
+        key = ResponseCache.make_key("model", "system", "template", "text")
+        self.assertEqual(key, ResponseCache.make_key("model", "system", "template", "text"))
+        self.assertNotEqual(key, ResponseCache.make_key("other", "system", "template", "text"))
+        self.assertNotEqual(key, ResponseCache.make_key("model", "system", "other", "text"))
+        self.assertNotEqual(key, ResponseCache.make_key("model", "system", "template", "other"))
+
+    def test_disk_tier_survives_restart(self):
+        self.cache.set("a", "summary a")
+        self.cache.set("b", "summary b")
+        self.assertEqual(self.cache.get("a"), "summary a")
+        self.cache.close()
+        self.cache = ResponseCache(self.db_path, max_memory_entries=1, max_disk_entries=2, ttl_seconds=60)
+        self.assertEqual(self.cache.get("b"), "summary b")
+
+    def test_disk_tier_evicts_least_recently_used(self):
+        self.cache.set("a", "summary a")
+        self.cache.set("b", "summary b")
+        self.cache.set("c", "summary c")
+        self.cache._memory.clear()
+        self.assertIsNone(self.cache.get("a"))
+        self.assertEqual(self.cache.get("c"), "summary c")
+
+    def test_expired_entries_are_not_returned(self):
+        self.cache.ttl_seconds = 0.01
+        self.cache.set("a", "summary a")
+        time.sleep(0.05)
+        self.assertIsNone(self.cache.get("a"))
+
+if __name__ == '__main__':
+    unittest.main()
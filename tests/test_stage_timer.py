@@ -0,0 +1,32 @@
+import time
+import unittest
+from src.stage_timer import StageTimer
+
+def slow_numbers(n, delay):
+    for i in range(n):
+        time.sleep(delay)
+        yield i
+
+class TestStageTimer(unittest.TestCase):
+    def test_nested_stages_report_exclusive_time(self):
+        timer = StageTimer()
+        source = timer.wrap(slow_numbers(3, 0.02), 'source')
+        doubled = timer.wrap((value * 2 for value in source), 'double')
+        self.assertEqual(list(doubled), [0, 2, 4])
+        report = timer.report()
+        self.assertEqual(list(report), ['double', 'source'])
+        self.assertEqual(report['source']['items'], 3)
+        self.assertGreaterEqual(report['source']['seconds'], 0.05)
+        # The waits inside the source generator are not charged to the downstream stage
+        self.assertLess(report['double']['seconds'], 0.02)
+
+    def test_stage_context_and_count(self):
+        timer = StageTimer()
+        with timer.stage('docx'):
+            time.sleep(0.01)
+        timer.count('docx', 2)
+        self.assertGreaterEqual(timer.report()['docx']['seconds'], 0.01)
+        self.assertEqual(timer.report()['docx']['items'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+from src.table_extractor import (
+    TableExtractor, parse_number, split_cell, table_to_frame, build_facts, tables_from_pages, tables_to_json,
+    tables_from_json
+)
+
+class TestTableExtractor(unittest.TestCase):
+    def setUp(self):
+        self.rows = [
+            ["", "2023", "Change", "2022"],
+            ["Total net sales", "$ 162,560", "(4)%", "$ 169,658"],
+            ["Macroeconomic adjustments", "72,559", "(2)%", "74,200"],
+            ["Gross margin", "$ 383,285", "(3)%", "$ 394,328"],
+            ["Diluted EPS", "6.13", "— %", "6.11"],
+            ["Footnote", None, None, None],
+        ]
+
+    def test_parse_number(self):
+        self.assertEqual(parse_number("$ 1,234.5"), 1234.5)
+        self.assertEqual(parse_number("(12)"), -12.0)
+        self.assertEqual(parse_number("8 %"), 8.0)
+        self.assertIsNone(parse_number("—"))
+        self.assertIsNone(parse_number("iPhone"))
+        self.assertEqual(parse_number("$ (18,661)"), -18661.0)
+
+    def test_parse_number_rejects_cells_with_several_numbers(self):
+        self.assertIsNone(parse_number("2022 2021"))
+        self.assertIsNone(parse_number("16,426,786 15,943,425"))
+        self.assertIsNone(parse_number("1 2"))
+
+    def test_split_cell(self):
+        self.assertEqual(split_cell("Greater China $ 20,819 $ 23,905 (13) %"), ["Greater China", "$20,819", "$23,905", "(13)%"])
+        self.assertEqual(split_cell("2022 2021"), ["2022", "2021"])
+        self.assertEqual(split_cell("Money market funds 2,000 — 2,000"), ["Money market funds", "2,000", "—", "2,000"])
+        self.assertEqual(split_cell("$ 162,560"), ["$ 162,560"])
+        self.assertEqual(split_cell("Balance as of December 30, 2023"), ["Balance as of December 30, 2023"])
+
+    def test_table_to_frame_splits_merged_cells(self):
+        rows = [["Total net sales $ 119,575 $ 117,154 2 %"], ["iPad 7,023 9,396 (25) %"]]
+        frame = table_to_frame(rows)
+        self.assertEqual(list(frame['label']), ["Total net sales", "iPad"])
+        self.assertEqual(list(frame.iloc[1, 1:]), [7023.0, 9396.0, -25.0])
+        self.assertEqual(build_facts([(18, 'millions', frame, None)]), "p.18 (millions) | Total net sales: 119,575; 117,154; 2%")
+
+    def test_breakdown_tables_keep_every_row(self):
+        rows = [["Americas $ 50,430 $ 49,278 2 %"], ["Greater China 20,819 23,905 (13) %"], ["Total net sales $ 119,575 $ 117,154 2 %"]]
+        page_text = "The following table shows net sales by reportable segment for the three months ended December 30, 2023"
+        tables = tables_from_pages([(17, page_text, [rows]), (4, "Condensed statements of operations", [rows])])
+        self.assertEqual(tables[0][3], "net sales by reportable segment")
+        self.assertIsNone(tables[1][3])
+        lines = build_facts(tables).splitlines()
+        self.assertEqual(lines[0], "p.17 | net sales by reportable segment | Americas: 50,430; 49,278; 2%")
+        self.assertEqual(lines[1], "p.17 | net sales by reportable segment | Greater China: 20,819; 23,905; -13%")
+        # Outside a breakdown table only sales, margin and earnings rows are facts
+        self.assertEqual(lines[3:], ["p.4 | Total net sales: 119,575; 117,154; 2%"])
+
+    def test_heading_rows_prefix_the_rows_below(self):
+        rows = [["Net sales $ 50,430 $ 49,278"], ["Europe:"], ["Net sales $ 30,397 $ 27,681"]]
+        facts = build_facts(tables_from_pages([(14, "Note 10 – Segment Information and Geographic Data", [rows])]))
+        self.assertEqual(facts.splitlines()[1], "p.14 | Segment Information | Europe - Net sales: 30,397; 27,681")
+
+    def test_table_to_frame_types_numeric_columns(self):
+        frame = table_to_frame(self.rows)
+        self.assertEqual(list(frame.columns), ['label', '2023', 'Change %', '2022'])
+        self.assertEqual(frame['2023'].dtype, 'float64')
+        self.assertEqual(frame.loc[0, '2022'], 169658.0)
+
+    def test_build_facts_reports_year_over_year_change(self):
+        facts = build_facts([(25, 'millions', table_to_frame(self.rows), None)], source='10-K.pdf')
+        lines = facts.splitlines()
+        # Labels match on whole words only, so "Macroeconomic" is not taken for "Mac"
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[0].startswith("10-K.pdf p.25 (millions) | Total net sales: 2023=162,560"))
+        self.assertIn("Change=-4%", lines[0])
+        self.assertIn("YoY=-4.2%", lines[0])
+        self.assertIn("Diluted EPS: 2023=6.13", lines[2])
+
+    def test_tables_round_trip_through_json(self):
+        tables = [(25, 'millions', table_to_frame(self.rows), "Net sales by reportable segment")]
+        restored = tables_from_json(tables_to_json(tables))
+        self.assertEqual(build_facts(restored), build_facts(tables))
+
+    def test_tables_from_pages_reads_unit_from_page_text(self):
+        tables = tables_from_pages([(25, "Net sales (in millions)", [self.rows]), (26, "Notes", [[["a"], ["b"]]])])
+        self.assertEqual(len(tables), 1)
+        self.assertEqual(tables[0][:2], (25, 'millions'))
+
+    def test_extract_tables_from_pdf(self):
+        tables = TableExtractor('tests/Apple_10Q.pdf').extract_tables()
+        self.assertTrue(all(frame.columns[0] == 'label' for _, _, frame, _ in tables))
+        facts = build_facts(tables, source='Apple_10Q.pdf').splitlines()
+        self.assertIn("Apple_10Q.pdf p.4 (millions) | Total net sales: 119,575; 117,154", facts)
+        self.assertIn("Apple_10Q.pdf p.17 (millions) | net sales by reportable segment | Greater China: 20,819; 23,905; -13%", facts)
+        self.assertIn("Apple_10Q.pdf p.18 (millions) | Net sales by category | iPhone: 69,702; 65,775; 6%", facts)
+
+if __name__ == '__main__':
+    unittest.main()
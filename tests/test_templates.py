@@ -0,0 +1,21 @@
+import unittest
+from src.templates import template_2_page, get_template_sections, section_template
+
+class TestTemplates(unittest.TestCase):
+    def test_get_template_sections(self):
+        sections = get_template_sections(template_2_page)
+        titles = [title for title, _ in sections]
+        self.assertEqual(titles[0], "Business Overview")
+        self.assertIn("Geographical Sales Breakdown", titles)
+        self.assertIn("Credit Rating Information", titles)
+        credit_points = dict(sections)["Credit Rating Information"]
+        self.assertIn("- Current Credit Rating", credit_points)
+        self.assertNotIn("Ensure the summary", credit_points)
+
+    def test_section_template(self):
+        prompt = section_template.format(title="SWOT Analysis", points="- Strengths")
+        self.assertIn("#### SWOT Analysis", prompt)
+        self.assertIn("- Strengths", prompt)
+
+if __name__ == '__main__':
+    unittest.main()
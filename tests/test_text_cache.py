@@ -0,0 +1,39 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from src.text_cache import TextCache
+
+class TestTextCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = TextCache(self.cache_dir, max_bytes=1024)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_document_key_is_content_addressed(self):
+        self.assertEqual(TextCache.document_key(b"pdf"), TextCache.document_key(b"pdf"))
+        self.assertNotEqual(TextCache.document_key(b"pdf"), TextCache.document_key(b"other pdf"))
+
+    def test_round_trip(self):
+        key = TextCache.document_key(b"pdf")
+        self.assertIsNone(self.cache.get(key, 'sentences'))
+        self.cache.set(key, 'sentences', "This is a sentence.\n")
+        self.assertEqual(self.cache.get(key, 'sentences'), "This is a sentence.\n")
+        self.cache.set_pages(key, ["page one", "page two"])
+        self.assertEqual(self.cache.get_pages(key), ["page one", "page two"])
+
+    def test_evicts_least_recently_used(self):
+        old_key = TextCache.document_key(b"old")
+        new_key = TextCache.document_key(b"new")
+        self.cache.set(old_key, 'sentences', "x" * 600)
+        past = time.time() - 60
+        os.utime(os.path.join(self.cache_dir, f"{old_key}.sentences.txt"), (past, past))
+        self.cache.set(new_key, 'sentences', "y" * 600)
+        self.assertIsNone(self.cache.get(old_key, 'sentences'))
+        self.assertEqual(self.cache.get(new_key, 'sentences'), "y" * 600)
+
+if __name__ == '__main__':
+    unittest.main()
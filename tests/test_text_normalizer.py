@@ -0,0 +1,26 @@
+import unittest
+from src.text_normalizer import normalize_text
+
+class TestTextNormalizer(unittest.TestCase):
+    def test_detects_headings_and_labels_per_line(self):
+        text = "UNITED STATES\nSECURITIES AND EXCHANGE COMMISSION\nNet sales by category:\nRevenue grew."
+        normalized = normalize_text(text)
+        self.assertIn("### UNITED STATES ###", normalized)
+        self.assertIn("### SECURITIES AND EXCHANGE COMMISSION ###", normalized)
+        self.assertIn("**Net sales by category:**", normalized)
+        self.assertTrue(normalized.endswith("Revenue grew. "))
+
+    def test_collapses_whitespace_and_joins_body_lines(self):
+        text = "Total   net\tsales\r\nincreased  8%.\n\n\nServices grew."
+        self.assertEqual(normalize_text(text), "Total net sales increased 8%. Services grew. ")
+
+    def test_single_letters_are_not_headings(self):
+        self.assertEqual(normalize_text("A\nI"), "A I ")
+
+    def test_large_input(self):
+        text = "Lorem ipsum dolor sit amet.\nRISK FACTORS\n" * 50000
+        normalized = normalize_text(text)
+        self.assertEqual(normalized.count("### RISK FACTORS ###"), 50000)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -25,6 +25,45 @@ class TestTextProcessor(unittest.TestCase):
         chunks = self.processor.chunk_text(text, chunk_size=3000)
         self.assertEqual(len(chunks), 4)
 
+    def test_parser_segmentation_matches_full(self):
+        text = "Revenue grew 8% year over year. Services reached a record. iPhone sales declined slightly."
+        parser_processor = TextProcessor(segmentation_mode="parser")
+        self.assertEqual(parser_processor.enhance_text_with_nlp(text), self.processor.enhance_text_with_nlp(text))
+    
+    def test_enhance_text_splits_oversized_input(self):
+        processor = TextProcessor(segmentation_mode="sentencizer", max_piece_chars=50)
+        text = "This is a sentence. " * 20
+        enhanced_text = processor.enhance_text_with_nlp(text)
+        self.assertEqual(enhanced_text.count("This is a sentence."), 20)
+
+    def test_iter_token_chunks(self):
+        records = [{'text': f"Sentence number {i} about revenue.", 'source': 'report.pdf', 'page': i // 10 + 1} for i in range(100)]
+        records.append({'text': "Another report starts here.", 'source': 'other.pdf', 'page': 1})
+        chunks = list(self.processor.iter_token_chunks(iter(records), max_tokens=60, overlap_tokens=20))
+        self.assertTrue(all(chunk['tokens'] <= 60 for chunk in chunks))
+        self.assertEqual(chunks[0]['page_start'], 1)
+        self.assertEqual(chunks[-2]['page_end'], 10)
+        # Chunks never span files and every sentence is kept whole
+        self.assertEqual(chunks[-1]['source'], 'other.pdf')
+        self.assertEqual(chunks[-1]['text'], "Another report starts here.")
+        self.assertTrue(all(chunk['text'].endswith("revenue.") for chunk in chunks[:-1]))
+        # Consecutive chunks overlap by their trailing sentences
+        last_sentence = "Sentence" + chunks[0]['text'].rsplit("Sentence", 1)[1]
+        self.assertTrue(chunks[1]['text'].startswith("Sentence"))
+        self.assertIn(last_sentence, chunks[1]['text'])
+    
+    def test_iter_token_chunks_splits_oversized_sentence(self):
+        records = [{'text': "word " * 500, 'source': 'report.pdf', 'page': 1}]
+        chunks = list(self.processor.iter_token_chunks(iter(records), max_tokens=100, overlap_tokens=10))
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(chunk['tokens'] <= 100 for chunk in chunks))
+    
+    def test_iter_page_sentence_records_tracks_pages(self):
+        pages = iter(["First page sentence.", "", "Third page sentence."])
+        records = list(self.processor.iter_page_sentence_records(self.processor.iter_normalized_pages(pages), 'report.pdf'))
+        self.assertEqual([record['page'] for record in records], [1, 3])
+        self.assertEqual(records[0]['source'], 'report.pdf')
+
 if __name__ == '__main__':
     unittest.main()
 